@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cost of appending a batch of rows vs the size of the dataset it is appended to
+
+For each size a synthetic snapshot is generated and loaded through a
+DatasetCache with the API's own artifact builders and extenders. Batches
+of new days (every series' latest row, moved forward) are then
+completed by ``ingest.prepare_batch``, appended with ``append_rows`` and
+picked up by the cache, as after ``POST /api/ingest``. Per artifact the
+suite prints the full build at load and the median extend over the
+appends; ``reload`` is the whole ``DatasetCache.get`` after an append.
+
+The business data has one row per date, department and region, so the
+API's rollup cube is a view of the rows. ``rollup (aggregated)`` extends a
+cube that stores partials over the same rows, the mode used when rows do
+combine, whose extend copies its cells.
+
+Usage: python benchmarks/append_bench.py [--sizes 100000 1000000 3000000] [--appends 5] [--days 1]
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+import synthetic  # noqa: F401 - puts mock_api on sys.path
+
+import app
+from data_cache import DatasetCache
+from data_store import append_rows, open_business_data
+from derived import RAW_COLUMNS
+from generate_data import DEPARTMENTS, REGIONS, DatasetPlan, write_snapshot_dataset
+from ingest import prepare_batch
+from rollup import RollupCube
+
+# Daily dates over about five years, as endpoints_bench generates them
+DATASET_DAYS = 5 * 365
+
+
+def timed(name, func, timings):
+    """``func`` recording its duration in ``timings[name]``"""
+    def run(*args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+    return run
+
+
+def next_days(dataset, days):
+    """Raw rows for ``days`` new days: every series' latest row, dated after the latest day"""
+    frame = dataset.select(list(RAW_COLUMNS))
+    latest = frame['date'].iloc[-1]
+    template = frame.groupby(['department', 'region'], observed=True).tail(1)
+    batches = []
+    for day in range(1, days + 1):
+        rows = template.assign(date=latest + pd.Timedelta(days=day))
+        batches.append(rows.astype({'department': str, 'region': str}))
+    raw = pd.concat(batches, ignore_index=True)
+    raw['date'] = raw['date'].dt.strftime('%Y-%m-%d')
+    return raw
+
+
+def measure(rows, appends, days, scratch):
+    csv_path = os.path.join(scratch, f'business_{rows}.csv')
+    departments = max(len(DEPARTMENTS), -(-rows // (DATASET_DAYS * len(REGIONS))))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        write_snapshot_dataset(DatasetPlan(rows, departments, len(REGIONS), 'daily'), csv_path)
+
+    builds, extends = {}, {}
+    cache = DatasetCache(
+        open_business_data,
+        builders={name: timed(name, build, builds) for name, build in app.DATASET_BUILDERS.items()},
+        extenders={name: timed(name, extend, extends) for name, extend in app.DATASET_EXTENDERS.items()}
+    )
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        dataset = cache.get(csv_path)
+    # The aggregated cube over the same rows, extended alongside the API's
+    cube = timed('rollup (aggregated)', RollupCube.build, builds)(dataset.frame, True)
+    extend_cube = timed('rollup (aggregated)', RollupCube.extend, extends)
+
+    batch_rows = 0
+    for _ in range(appends):
+        batch = prepare_batch(next_days(dataset, days), dataset, dataset.artifacts['derived'])
+        batch_rows = len(batch)
+        start = dataset.rows
+        if append_rows(csv_path, batch) != 'append':
+            raise RuntimeError("The batch did not append to the snapshot")
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            dataset = timed('reload', cache.get, extends)(csv_path)
+        cube = extend_cube(cube, dataset.frame, start)
+
+    return batch_rows, builds, extends
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000])
+    parser.add_argument('--appends', type=int, default=5)
+    parser.add_argument('--days', type=int, default=1, help="Days of rows per appended batch")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12}  {'batch':>6}  {'artifact':<20} {'build ms':>10} {'extend ms':>10}")
+    with tempfile.TemporaryDirectory() as scratch:
+        for rows in args.sizes:
+            batch_rows, builds, extends = measure(rows, args.appends, args.days, scratch)
+            for name in list(app.DATASET_BUILDERS) + ['rollup (aggregated)', 'reload']:
+                build = f"{builds[name][0] * 1000:>10.1f}" if name in builds else f"{'':>10}"
+                print(f"{rows:>12,}  {batch_rows:>6}  {name:<20} {build} "
+                      f"{statistics.median(extends[name]) * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
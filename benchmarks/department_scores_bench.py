@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Department comparison / profitability: per-department loops vs grouped reductions
+
+The loop versions are the handlers as they were - one boolean-mask scan of
+the filtered rows per department plus a full-column sum inside the loop. The
+grouped versions compute every department's totals in one reduction, either
+over the raw rows or (as the API does) over the rollup cube, and derive the
+scores as column operations.
+
+Usage: python benchmarks/department_scores_bench.py [--rows 100000 10000000] [--departments 7 60]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from synthetic import make_business_frame
+
+from app import department_comparison_scores, profitability_scores
+from data_schema import apply_schema
+from rollup import RollupCube
+
+
+def loop_department_comparison(df):
+    dept_comparison = []
+    for dept in df['department'].unique():
+        dept_df = df[df['department'] == dept]
+        revenue_score = min(100, (dept_df['revenue'].sum() / df['revenue'].sum()) * 500)
+        efficiency_score = max(0, 100 - ((dept_df['expenses'].sum() / dept_df['revenue'].sum()) * 100))
+        performance_score = float(dept_df['performance_score'].mean())
+        dept_comparison.append({
+            'department': dept,
+            'revenue_score': round(revenue_score, 1),
+            'efficiency_score': round(efficiency_score, 1),
+            'growth_score': round(random.uniform(60, 95), 1),
+            'performance_score': round(performance_score, 1),
+            'innovation_score': round(random.uniform(70, 98), 1)
+        })
+    return dept_comparison
+
+
+def loop_profitability(df):
+    profitability_data = []
+    for dept in df['department'].unique():
+        dept_df = df[df['department'] == dept]
+        revenue = dept_df['revenue'].sum() / 1000000
+        profit_margin = ((dept_df['revenue'].sum() - dept_df['expenses'].sum()) / dept_df['revenue'].sum()) * 100
+        profitability_data.append({
+            'department': dept,
+            'revenue': round(revenue, 1),
+            'profit_margin': round(profit_margin, 1),
+            'market_share': round(random.uniform(10, 30), 1)
+        })
+    return profitability_data
+
+
+COMPARISON = {'revenue': 'sum', 'expenses': 'sum', 'performance_score': 'mean'}
+PROFITABILITY = {'revenue': 'sum', 'expenses': 'sum'}
+
+
+def grouped(df, aggregations):
+    return df.groupby('department', observed=True).agg(aggregations).reset_index()
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+
+def check(loop_rows, frame, columns):
+    # Same departments and the same data-derived scores (simulated ones differ by design)
+    by_department = {row['department']: row for row in loop_rows}
+    for row in frame.to_dict(orient='records'):
+        for column in columns:
+            assert abs(by_department[row['department']][column] - row[column]) <= 0.1, (row['department'], column)
+    assert len(by_department) == len(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 10_000_000])
+    parser.add_argument('--departments', type=int, nargs='+', default=[7, 60])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'depts':>6}  {'endpoint':<22} {'loop ms':>10} {'grouped ms':>11} {'cube ms':>9} {'speedup':>8}")
+    for rows in args.rows:
+        for departments in args.departments:
+            df = apply_schema(make_business_frame(rows, departments=departments))
+            cube = RollupCube.build(df)
+
+            cases = (
+                ('department-comparison', loop_department_comparison, department_comparison_scores, COMPARISON,
+                 ('revenue_score', 'efficiency_score', 'performance_score')),
+                ('profitability', loop_profitability, profitability_scores, PROFITABILITY,
+                 ('revenue', 'profit_margin'))
+            )
+            for name, loop, scores, aggregations, columns in cases:
+                loop_ms, loop_rows = best_of(args.repeat, lambda: loop(df))
+                grouped_ms, grouped_frame = best_of(args.repeat, lambda: scores(grouped(df, aggregations)))
+                cube_ms, cube_frame = best_of(args.repeat, lambda: scores(cube.rollup('department', aggregations)))
+                check(loop_rows, grouped_frame, columns)
+                check(loop_rows, cube_frame, columns)
+
+                print(f"{rows:>12,} {departments:>6}  {name:<22} {loop_ms:>10.2f} {grouped_ms:>11.2f} {cube_ms:>9.2f} "
+                      f"{loop_ms / max(cube_ms, 1e-9):>7.1f}x")
+            print(f"{'':>12} {'':>6}  rollup cube: {len(cube):,} cells")
+            del df, cube
+
+
+if __name__ == '__main__':
+    np.seterr(all='ignore')
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Latency, peak memory and response size of every API endpoint at scaled data sizes
+
+For each size a synthetic dataset with the business CSV's 30 columns is
+generated and written as the API's columnar snapshot. Every GET route
+(except the endless live stream) is then requested ``--repeat`` times -
+or fewer, once ``--budget`` seconds are spent on it - through the Flask
+test client, with the response cache and memoized results cleared
+before each request so the handler runs in full (pass ``--warm`` to keep
+them). Per endpoint the suite records p50/p95/p99
+latency, the peak RSS reached while serving it (next to the RSS before
+it) and the response size. Bodies are read chunk by chunk, so streamed
+exports are never held in memory whole.
+
+The row endpoints return every row unless paged; above ``--unpaged-rows``
+rows they are requested as one ``?limit=`` page instead, since a full dump
+of 10M rows takes more memory than most machines have.
+
+Results are written as JSON with sorted keys, so two runs can be diffed
+directly or with ``--compare``:
+
+    python benchmarks/endpoints_bench.py --output before.json
+    # ... change something ...
+    python benchmarks/endpoints_bench.py --output after.json --compare before.json
+
+Peak RSS is exact per endpoint on Linux (the kernel's high-water mark is
+reset before each one); elsewhere it is the process peak so far.
+
+Usage: python benchmarks/endpoints_bench.py [--rows 700 100000 1000000 10000000] [--repeat 20]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import synthetic  # noqa: F401 - puts mock_api on sys.path
+
+import app
+from data_schema import memory_bytes
+from data_store import snapshot_path
+from generate_data import DEPARTMENTS, REGIONS, DatasetPlan, write_snapshot_dataset
+from report_pool import ReportPool
+from serialization import HAS_ORJSON
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+SKIPPED_ROUTES = ('/api/google/stream',)
+# Endpoints that return the raw rows, paged only when asked to
+ROW_ROUTES = ('/api/sales', '/api/google/data', '/api/sap/data')
+DEFAULT_ROWS = [700, 100_000, 1_000_000, 10_000_000]
+PERCENTILES = (50, 95, 99)
+# Daily dates over about five years; larger datasets get more departments instead of more days
+DATASET_DAYS = 5 * 365
+
+
+def generate(rows, csv_path):
+    # The API serves from the snapshot and only checks the CSV's size and
+    # mtime against it, so a header-only CSV stands in for gigabytes of text
+    departments = max(len(DEPARTMENTS), -(-rows // (DATASET_DAYS * len(REGIONS))))
+    write_snapshot_dataset(DatasetPlan(rows, departments, len(REGIONS), 'daily'), csv_path)
+
+
+def dataset_csv(rows, directory):
+    """CSV path of a ``rows``-row synthetic dataset, generating its snapshot unless already there.
+
+    Generation runs in a child process, so the memory it takes is returned
+    before any endpoint is measured.
+    """
+    csv_path = os.path.join(directory, f'business_{rows}.csv')
+    if os.path.exists(csv_path) and os.path.isdir(snapshot_path(csv_path)):
+        return csv_path, 0.0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        executor.submit(generate, rows, csv_path).result()
+    return csv_path, time.perf_counter() - start
+
+
+def endpoints(queries, paged, skip):
+    rules = sorted(
+        rule.rule for rule in app.app.url_map.iter_rules()
+        if rule.rule.startswith('/api/') and 'GET' in rule.methods and '<' not in rule.rule
+        and rule.rule not in SKIPPED_ROUTES and not any(part in rule.rule for part in skip)
+    )
+    urls = []
+    for query in queries:
+        for rule in rules:
+            parameters = [query] if query else []
+            if paged and rule in ROW_ROUTES:
+                parameters.append(f'limit={app.DEFAULT_PAGE_ROWS}')
+            urls.append(rule + ('?' + '&'.join(parameters) if parameters else ''))
+    return urls
+
+
+def fetch(client, url):
+    """Request ``url`` and read the whole body chunk by chunk: ``(status, body bytes)``"""
+    response = client.get(url, buffered=False)
+    try:
+        size = sum(len(chunk) for chunk in response.response)
+    finally:
+        response.close()
+    return response.status_code, size
+
+
+def reset_peak_rss():
+    """Restart the kernel's peak-RSS counter for this process (Linux); False where unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as handle:
+            handle.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def process_status(field):
+    """A memory field of /proc/self/status in bytes, None where there is no /proc"""
+    try:
+        with open('/proc/self/status') as handle:
+            for line in handle:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss():
+    peak = process_status('VmHWM')
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def clear_caches():
+    app.response_cache.clear()
+    dataset = app.load_dataset()
+    if dataset is not None:
+        dataset.clear_derived()
+
+
+def measure(client, url, args):
+    """Latency percentiles (ms), peak RSS and response size of up to ``--repeat`` requests to ``url``"""
+    # One untimed request first, so lazily mapped columns are already in memory
+    fetch(client, url)
+    timings = []
+    baseline = process_status('VmRSS')
+    reset_peak_rss()
+    deadline = time.perf_counter() + args.budget
+    while len(timings) < args.repeat and (len(timings) < args.min_repeat or time.perf_counter() < deadline):
+        if not args.warm:
+            clear_caches()
+        start = time.perf_counter()
+        status, size = fetch(client, url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings = np.array(timings)
+    result = {f'p{p}_ms': round(float(np.percentile(timings, p)), 3) for p in PERCENTILES}
+    result.update(
+        requests=len(timings),
+        mean_ms=round(float(timings.mean()), 3),
+        max_ms=round(float(timings.max()), 3),
+        status=status,
+        response_bytes=size,
+        peak_rss_bytes=peak_rss(),
+        rss_before_bytes=baseline
+    )
+    return result
+
+
+def run(rows, directory, args):
+    csv_path, generate_seconds = dataset_csv(rows, directory)
+    app.DATA_PATH = csv_path
+    app.dataset_cache.invalidate()
+    app.response_cache.clear()
+
+    start = time.perf_counter()
+    dataset = app.load_dataset()
+    load_seconds = time.perf_counter() - start
+
+    client = app.app.test_client()
+    print(f"\n{rows:,} rows  (generated in {generate_seconds:.1f} s, loaded in {load_seconds:.2f} s)")
+    print(f"{'endpoint':<56} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>9} {'KB':>9}")
+
+    results = {}
+    for url in endpoints(args.queries, rows > args.unpaged_rows, args.skip):
+        result = measure(client, url, args)
+        results[url] = result
+        peak = result['peak_rss_bytes']
+        print(f"{url:<56} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{peak / 1e6 if peak else float('nan'):>9.1f} {result['response_bytes'] / 1024:>9.1f}")
+
+    return {
+        'rows': rows,
+        'load_seconds': round(load_seconds, 3),
+        'memory_bytes': memory_bytes(dataset.frame),
+        'endpoints': results
+    }
+
+
+def environment(args):
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'orjson': HAS_ORJSON,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'peak_rss': 'per endpoint' if reset_peak_rss() else 'process',
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'repeat': args.repeat,
+        'budget_seconds': args.budget,
+        'min_repeat': args.min_repeat,
+        'unpaged_rows': args.unpaged_rows,
+        'warm': args.warm,
+        'report_workers': args.report_workers
+    }
+
+
+def compare(previous, current):
+    """Print the p50/p95 change of every endpoint measured in both runs"""
+    print(f"\n{'rows':>12}  {'endpoint':<56} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'p95 change':>11}")
+    for rows, dataset in current['datasets'].items():
+        before = previous['datasets'].get(rows)
+        if before is None:
+            continue
+        for url, result in dataset['endpoints'].items():
+            old = before['endpoints'].get(url)
+            if old is None:
+                continue
+            p50 = result['p50_ms'] / max(old['p50_ms'], 1e-9) - 1
+            p95 = result['p95_ms'] / max(old['p95_ms'], 1e-9) - 1
+            print(f"{int(rows):>12,}  {url:<56} {old['p50_ms']:>11.2f} {result['p50_ms']:>10.2f} "
+                  f"{p50:>+8.0%} {p95:>+11.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--budget', type=float, default=10,
+                        help="Seconds per endpoint after which it stops repeating")
+    parser.add_argument('--min-repeat', type=int, default=3, help="Requests per endpoint however long they take")
+    parser.add_argument('--unpaged-rows', type=int, default=1_000_000,
+                        help="Largest dataset whose row endpoints are requested unpaged")
+    parser.add_argument('--skip', nargs='+', default=[], help="Skip routes containing any of these strings")
+    parser.add_argument('--queries', nargs='+', default=[''],
+                        help="Query strings each endpoint is requested with ('' for none)")
+    parser.add_argument('--warm', action='store_true', help="Keep the response cache between requests")
+    parser.add_argument('--report-workers', type=int, default=0,
+                        help="Report worker processes (0 computes reports in this process, so their memory counts)")
+    parser.add_argument('--data-dir', help="Keep generated datasets here and reuse them on later runs")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    app.report_pool = ReportPool(args.report_workers)
+    results = {'environment': environment(args), 'datasets': {}}
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.data_dir or scratch
+        os.makedirs(directory, exist_ok=True)
+        for rows in args.rows:
+            results['datasets'][str(rows)] = run(rows, directory, args)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(json.load(handle), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Filter microbenchmark: boolean mask scan vs sorted date / category index
+
+Usage: python benchmarks/filter_index_bench.py [--sizes 1000 100000 10000000] [--repeat 5]
+"""
+
+import argparse
+import time
+
+from synthetic import make_business_frame
+
+from app import filter_mask
+from data_index import DataIndex
+
+FILTER_CASES = {
+    'date range': {'start_date': '2021-01-01', 'end_date': '2021-06-30'},
+    'year': {'year': 2022},
+    'region': {'region': 'Europe'},
+    'date + region + dept': {'start_date': '2021-01-01', 'end_date': '2022-12-31', 'region': 'Europe', 'department': 'Cloud'}
+}
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def select_with_index(df, index, filters):
+    rows = index.select(filters)
+    return df.iloc[rows] if isinstance(rows, slice) else df.take(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12}  {'filter':<22} {'mask ms':>10} {'index ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        df = make_business_frame(size)
+
+        start = time.perf_counter()
+        index = DataIndex.build(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for name, filters in FILTER_CASES.items():
+            mask_time, masked = best_of(args.repeat, lambda: df[filter_mask(df, filters)])
+            index_time, indexed = best_of(args.repeat, lambda: select_with_index(df, index, filters))
+            assert len(masked) == len(indexed), name
+
+            print(f"{size:>12,}  {name:<22} {mask_time * 1000:>10.3f} {index_time * 1000:>10.3f} "
+                  f"{mask_time / max(index_time, 1e-9):>7.1f}x")
+        print(f"{'':>12}  index build: {build_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint response time with the old and the new JSON serialization
+
+The old path is ``display_frame(df).to_dict(orient='records')`` encoded by
+Flask's default JSON provider; the new one builds records from whole columns
+and encodes them with ``serialization.dumps`` (orjson when installed). Each
+endpoint is timed through the Flask test client on the real CSV tiled out to
+``--rows`` rows, so everything but the serialization is identical and the
+difference between the columns is the serialization cost. The response
+cache and derived results are cleared before every timed request, so no
+run is answered with a body encoded by the other provider.
+
+Usage: python benchmarks/serialization_bench.py [--rows 700 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+import synthetic  # noqa: F401 - puts mock_api on sys.path
+
+import app
+from data_schema import display_frame
+from data_store import DEFAULT_CSV_PATH
+from serialization import HAS_ORJSON
+
+SKIPPED_ROUTES = ('/api/test', '/api/health', '/api/google/export', '/api/sales/csv', '/api/google/stream')
+
+
+def tiled_csv(rows, directory):
+    """The business CSV repeated over later five-year spans until it has ``rows`` rows"""
+    base = pd.read_csv(DEFAULT_CSV_PATH)
+    dates = pd.to_datetime(base['date'])
+    span = dates.dt.year.max() - dates.dt.year.min() + 1
+
+    tiles = []
+    for tile in range(-(-rows // len(base))):
+        shifted = dates + pd.DateOffset(years=tile * span)
+        tiles.append(base.assign(
+            date=shifted.dt.strftime('%Y-%m-%d'),
+            year=shifted.dt.year,
+            quarter=shifted.dt.year.astype(str) + '-Q' + shifted.dt.quarter.astype(str)
+        ))
+
+    path = os.path.join(directory, f'business_{rows}.csv')
+    pd.concat(tiles, ignore_index=True).head(rows).to_csv(path, index=False)
+    return path
+
+
+def legacy_payload(df):
+    return display_frame(df).to_dict(orient='records')
+
+
+def endpoints():
+    return sorted(
+        rule.rule for rule in app.app.url_map.iter_rules()
+        if rule.rule.startswith('/api/') and 'GET' in rule.methods
+        and '<' not in rule.rule and rule.rule not in SKIPPED_ROUTES
+    )
+
+
+def clear_caches():
+    """Drop cached responses and derived results, so each request is computed and encoded again"""
+    app.response_cache.clear()
+    dataset = app.load_dataset()
+    if dataset is not None:
+        dataset.clear_derived()
+
+
+def best_of(repeat, client, url):
+    timings = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - start)
+    assert response.status_code == 200, (url, response.status_code)
+    return min(timings) * 1000, len(response.data)
+
+
+def run(rows, repeat, directory):
+    app.DATA_PATH = tiled_csv(rows, directory)
+    app.dataset_cache.invalidate()
+    app.load_dataset()
+    client = app.app.test_client()
+    fast_payload = app.frame_payload
+
+    print(f"\n{rows:,} rows  (orjson {'installed' if HAS_ORJSON else 'not installed, stdlib json'})")
+    print(f"{'endpoint':<48} {'old ms':>9} {'new ms':>9} {'columnar':>9} {'speedup':>8} {'KB':>8}")
+
+    # Restored afterwards: app.py installs its provider with the metrics timer
+    fast_json = app.app.json
+    try:
+        for url in endpoints():
+            app.app.json = DefaultJSONProvider(app.app)
+            app.frame_payload = legacy_payload
+            old_ms, _ = best_of(repeat, client, url)
+
+            app.app.json = fast_json
+            app.frame_payload = fast_payload
+            new_ms, size = best_of(repeat, client, url)
+            columnar_ms, _ = best_of(repeat, client, url + '?format=columnar')
+
+            print(f"{url:<48} {old_ms:>9.2f} {new_ms:>9.2f} {columnar_ms:>9.2f} "
+                  f"{old_ms / max(new_ms, 1e-9):>7.1f}x {size / 1024:>8.1f}")
+    finally:
+        app.app.json = fast_json
+        app.frame_payload = fast_payload
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[700, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            run(rows, args.repeat, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Serving throughput: the Flask development server vs the ASGI mode under a local load generator
+
+Each server runs in its own process on the real dataset. Client threads in
+this process request dashboard chart and KPI URLs back to back over
+keep-alive connections for a fixed time, in three scenarios:
+
+- charts: only the chart clients
+- exports: plus clients downloading the full CSV export in a loop
+- live: plus idle live-update streams held open for the whole run
+
+Usage: python benchmarks/serving_bench.py [--clients 8 32] [--duration 10] [--streams 200]
+"""
+
+import argparse
+import http.client
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from synthetic import MOCK_API_DIR
+
+SERVERS = {
+    # What ``python mock_api/app.py`` runs, on another port
+    'flask': "import sys, app; app.app.run(host='127.0.0.1', port=int(sys.argv[1]), debug=False)",
+    'asgi': "import sys; sys.argv[1:] = ['--host', '127.0.0.1', '--port', sys.argv[1]]; import asgi; asgi.main()"
+}
+
+CHART_URLS = [
+    f'/api/google/{path}?{query}'
+    for query in ('', 'region=Europe', 'department=Cloud', 'year=2023', 'simulate=1')
+    for path in (
+        'kpis', 'charts/revenue-trend', 'charts/department-performance', 'charts/region-distribution',
+        'charts/quarterly-trends', 'charts/department-comparison', 'charts/regional-heatmap'
+    )
+]
+EXPORT_URL = '/api/google/export'
+STREAM_URL = '/api/google/stream'
+
+
+def start_server(name, port):
+    server = subprocess.Popen(
+        [sys.executable, '-c', SERVERS[name], str(port)],
+        cwd=MOCK_API_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"{name} server did not start on port {port}")
+
+
+def client(port, urls, stop, results):
+    """Request ``urls`` round-robin until ``stop``; appends (latency, ok) per request"""
+    connection = None
+    position = 0
+    while not stop.is_set():
+        url = urls[position % len(urls)]
+        position += 1
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            connection.request('GET', url)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+            if response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException):
+            ok = False
+            connection = None
+        results.append((time.perf_counter() - start, ok))
+
+
+def open_streams(port, count):
+    streams = []
+    for _ in range(count):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        connection.request('GET', STREAM_URL)
+        response = connection.getresponse()
+        response.fp.read1(1)  # the stream is open once the first bytes arrive
+        streams.append((connection, response))
+    return streams
+
+
+def run(port, clients, duration, exporters=0, streams=0):
+    held = open_streams(port, streams)
+    stop = threading.Event()
+    results = []
+    threads = [threading.Thread(target=client, args=(port, CHART_URLS, stop, results)) for _ in range(clients)]
+    threads += [threading.Thread(target=client, args=(port, [EXPORT_URL], stop, [])) for _ in range(exporters)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    for connection, response in held:
+        response.close()
+        connection.close()
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+
+    def percentile(share):
+        return latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1000 if latencies else float('nan')
+
+    return len(latencies) / duration, percentile(0.5), percentile(0.95), percentile(0.99), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--clients', type=int, nargs='+', default=[8, 32])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--exporters', type=int, default=2, help="Export downloads running in the exports scenario")
+    parser.add_argument('--streams', type=int, default=200, help="Live streams held open in the live scenario")
+    parser.add_argument('--port', type=int, default=5090)
+    args = parser.parse_args()
+
+    scenarios = (
+        ('charts', {}),
+        ('exports', {'exporters': args.exporters}),
+        ('live', {'streams': args.streams})
+    )
+    print(f"{'server':<7} {'scenario':<9} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for offset, name in enumerate(args.servers):
+        port = args.port + offset
+        server = start_server(name, port)
+        try:
+            # Warm the response cache and the live channel so every run measures steady state
+            run(port, 1, 1, streams=1)
+            for scenario, options in scenarios:
+                for clients in args.clients:
+                    rate, p50, p95, p99, errors = run(port, clients, args.duration, **options)
+                    print(f"{name:<7} {scenario:<9} {clients:>7} {rate:>8.0f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {errors:>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
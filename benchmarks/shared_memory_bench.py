@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Per-worker memory with a memory-mapped vs a private copy of the dataset
+
+Each worker process loads the same snapshot through the API's own
+``load_dataset()``, so besides the columns it builds every dataset artifact
+(rollup cube, filter index, derived-metric state, year partitions) as a
+server worker or report worker does at startup. It then answers the
+dashboard's WARM_UP_URLS, which reads the columns the page needs. Before
+loading and after each step it reports its RSS, PSS and private memory from
+/proc/self/smaps_rollup, so this benchmark is Linux only.
+
+Only the columns are mapped; the artifacts, the response cache and
+whatever the allocator keeps from building them are private to each
+worker, and show up in the private column of both modes.
+
+Usage: python benchmarks/shared_memory_bench.py [--rows 2000000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import tempfile
+
+import synthetic  # noqa: F401 - puts mock_api on sys.path
+
+import app
+from data_cache import DatasetCache
+from data_store import open_snapshot, snapshot_path
+from generate_data import DEPARTMENTS, REGIONS, DatasetPlan, write_snapshot_dataset
+
+MEMORY_FIELDS = ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')
+# After the imports (the interpreter and libraries alone), after load_dataset() and after the warm-up requests
+STEPS = ('started', 'loaded', 'served')
+# Daily dates over about five years, as endpoints_bench generates them
+DATASET_DAYS = 5 * 365
+
+
+def smaps_rollup():
+    values = {}
+    with open('/proc/self/smaps_rollup') as handle:
+        for line in handle:
+            name, _, rest = line.partition(':')
+            if name in MEMORY_FIELDS:
+                values[name] = int(rest.split()[0]) * 1024
+    return values
+
+
+def private_snapshot(csv_path):
+    """The snapshot read into private arrays instead of memory-mapped"""
+    return open_snapshot(csv_path, mmap=False)
+
+
+def worker(csv_path, mmap, ready, results):
+    app.DATA_PATH = csv_path
+    if not mmap:
+        app.dataset_cache = DatasetCache(private_snapshot, builders=app.DATASET_BUILDERS,
+                                         extenders=app.DATASET_EXTENDERS)
+
+    usages = [smaps_rollup()]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        app.load_dataset()
+        # Measure only once every worker holds the data, so PSS reflects the sharing
+        ready.wait()
+        usages.append(smaps_rollup())
+
+        client = app.app.test_client()
+        for url in app.WARM_UP_URLS:
+            client.get(url)
+        ready.wait()
+        usages.append(smaps_rollup())
+
+    results.put(usages)
+    ready.wait()
+
+
+def measure(csv_path, mmap, workers):
+    context = multiprocessing.get_context('spawn')
+    ready = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(csv_path, mmap, ready, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    usages = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return [{field: sum(u[step][field] for u in usages) / workers for field in MEMORY_FIELDS}
+            for step in range(len(STEPS))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        csv_path = os.path.join(scratch, 'business.csv')
+        departments = max(len(DEPARTMENTS), -(-args.rows // (DATASET_DAYS * len(REGIONS))))
+        write_snapshot_dataset(DatasetPlan(args.rows, departments, len(REGIONS), 'daily'), csv_path)
+        data_mb = sum(os.path.getsize(os.path.join(root, name))
+                      for root, _, names in os.walk(snapshot_path(csv_path)) for name in names) / 1e6
+        print(f"{args.rows:,} rows, snapshot {data_mb:.1f} MB on disk")
+        print(f"{'mode':<8} {'workers':>7} {'step':<8} {'RSS MB':>9} {'PSS MB':>9} {'private MB':>11}   (per worker)")
+
+        for mmap in (True, False):
+            for workers in args.workers:
+                for step, usage in zip(STEPS, measure(csv_path, mmap, workers)):
+                    private = usage['Private_Clean'] + usage['Private_Dirty']
+                    print(f"{'mmap' if mmap else 'copy':<8} {workers:>7} {step:<8} {usage['Rss'] / 1e6:>9.1f} "
+                          f"{usage['Pss'] / 1e6:>9.1f} {private / 1e6:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Synthetic business frames for the benchmark scripts"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The API modules are imported the same way app.py imports them when run as a script
+MOCK_API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mock_api')
+if MOCK_API_DIR not in sys.path:
+    sys.path.insert(0, MOCK_API_DIR)
+
+from generate_data import DEPARTMENTS, REGIONS, department_names, region_names  # noqa: E402
+
+
+def make_business_frame(rows, departments=len(DEPARTMENTS), regions=len(REGIONS), start='2020-01-01', seed=0,
+                        compact=False):
+    """Date-sorted frame with the filter and core metric columns of the business CSV.
+
+    Dates and labels are strings, as parsed from the CSV; with ``compact``
+    dates stay datetime64 and labels are categoricals, which takes a fraction
+    of the memory at millions of rows.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Spread the rows over daily dates, several rows per day once rows > days
+    days = max(1, min(rows, 5 * 365))
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, rows)), unit='D')
+    date_index = pd.DatetimeIndex(dates)
+
+    department_values = np.array(department_names(departments), dtype=object)
+    region_values = np.array(region_names(regions), dtype=object)
+
+    revenue = rng.uniform(1.8e7, 1.3e8, rows).round(2)
+    expenses = (revenue * rng.uniform(0.3, 0.7, rows)).round(2)
+
+    department_codes = rng.integers(0, departments, rows)
+    region_codes = rng.integers(0, regions, rows)
+    if compact:
+        quarter_keys = date_index.year * 4 + date_index.quarter - 1
+        quarter_values = np.unique(quarter_keys)
+        dates = date_index
+        quarters = pd.Categorical.from_codes(
+            np.searchsorted(quarter_values, quarter_keys), [f'{key // 4}-Q{key % 4 + 1}' for key in quarter_values]
+        )
+        department_labels = pd.Categorical.from_codes(department_codes, department_values)
+        region_labels = pd.Categorical.from_codes(region_codes, region_values)
+    else:
+        dates = date_index.strftime('%Y-%m-%d')
+        quarters = date_index.year.astype(str) + '-Q' + date_index.quarter.astype(str)
+        department_labels = department_values[department_codes]
+        region_labels = region_values[region_codes]
+
+    return pd.DataFrame({
+        'date': dates,
+        'quarter': quarters,
+        'year': date_index.year,
+        'quarter_num': date_index.quarter,
+        'department': department_labels,
+        'region': region_labels,
+        'revenue': revenue,
+        'expenses': expenses,
+        'employees': rng.integers(5000, 50000, rows),
+        'performance_score': rng.uniform(70, 100, rows).round(2),
+        'profit': (revenue - expenses).round(2)
+    })
+
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+ASGI serving mode for the dashboard API
+
+``python mock_api/asgi.py`` serves the same Flask routes through an ASGI
+server (uvicorn, ``pip install uvicorn``); any other ASGI server can load
+``asgi:app`` from the mock_api directory. The event loop only moves bytes:
+
+- every request runs the Flask app on a bounded thread pool, so pandas work
+  never blocks the loop and at most ``workers`` requests compute at once
+- each endpoint admits at most ``ENDPOINT_LIMITS[path]`` (by default
+  ``DEFAULT_LIMIT``) requests at a time; the rest wait in line, and get a
+  503 with ``Retry-After`` after ``QUEUE_TIMEOUT`` seconds
+- streamed bodies (CSV exports) take a pool thread per chunk rather than for
+  the whole download, and live-update streams wait on the event loop, so an
+  idle dashboard client holds no thread at all
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import (
+    ALLOW_INGEST_ENV, ALLOW_PROFILING_ENV, app as flask_app, enable_ingest, enable_profiling, prepare_in_background
+)
+
+# Threads running the Flask app; pandas holds the GIL for much of its work, so
+# more threads than cores mostly add queueing inside the interpreter
+DEFAULT_WORKERS = max(4, os.cpu_count() or 1)
+
+# Requests of one endpoint allowed at once, so slow endpoints cannot take
+# every pool thread; endpoints not listed get DEFAULT_LIMIT each
+ENDPOINT_LIMITS = {
+    '/api/reports/annual-summary': 2,
+    '/api/reports/quarterly-analysis': 2,
+    '/api/google/export': 2,
+    '/api/sales/csv': 2,
+    '/api/ingest': 1,
+    # Held for as long as a client listens; waiting costs no thread
+    '/api/google/stream': 1000
+}
+DEFAULT_LIMIT = 16
+# Seconds a request waits for its endpoint before it is turned away
+QUEUE_TIMEOUT = 30
+# Headers the ASGI server adds to every response itself (uvicorn, hypercorn and
+# daphne all send Date), dropped from the Flask response so they are not sent twice
+SERVER_HEADERS = ('date',)
+
+
+class AsgiApp:
+    """ASGI application running a WSGI app on a bounded thread pool, with per-endpoint limits"""
+
+    def __init__(self, wsgi_app, workers=DEFAULT_WORKERS, limits=None, default_limit=DEFAULT_LIMIT,
+                 queue_timeout=QUEUE_TIMEOUT):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asgi-worker')
+        self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+        self.default_limit = default_limit
+        self.queue_timeout = queue_timeout
+        # Semaphores belong to the event loop they were created on
+        self._semaphores = {}
+        self._loop = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            self._use_loop()
+            await self._http(scope, receive, send)
+
+    def _use_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # run_in_executor(None, ...) - the live streams' first compute - shares the pool
+            loop.set_default_executor(self.executor)
+            self._semaphores = {}
+            self._loop = loop
+
+    def _semaphore(self, path):
+        if path not in self._semaphores:
+            self._semaphores[path] = asyncio.Semaphore(self.limits.get(path, self.default_limit))
+        return self._semaphores[path]
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._use_loop()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        semaphore = self._semaphore(scope['path'])
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            await send_busy(send)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+            environ = wsgi_environ(scope, bytes(body))
+            status, headers, written, iterable = await loop.run_in_executor(self.executor, self._call, environ)
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            if iterable is None:
+                await send({'type': 'http.response.body', 'body': b''.join(written)})
+            else:
+                await self._stream(iterable, written, receive, send)
+        finally:
+            semaphore.release()
+
+    def _call(self, environ):
+        """Run the WSGI app in a pool thread: ``(status, headers, body chunks, streamed body or None)``.
+
+        A body of known length is read here in full. Others - CSV exports,
+        live streams - are returned to be sent as they are produced.
+        """
+        response = {'written': []}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and 'status' in response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+                if name.lower() not in SERVER_HEADERS
+            ]
+            return response['written'].append
+
+        iterable = self.wsgi_app(environ, start_response)
+        status, headers, written = response['status'], response['headers'], response['written']
+        if hasattr(iterable, '__aiter__') or not any(name == b'content-length' for name, _ in headers):
+            return status, headers, written, iterable
+        try:
+            return status, headers, written + list(iterable), None
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    async def _stream(self, iterable, written, receive, send):
+        """Send a streamed body until it ends or the client goes away"""
+        gone = asyncio.ensure_future(disconnected(receive))
+        try:
+            for chunk in written:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if hasattr(iterable, '__aiter__'):
+                await self._send_events(iterable.__aiter__(), gone, send)
+            else:
+                await self._send_chunks(iterable, gone, send)
+        finally:
+            gone.cancel()
+
+    async def _send_chunks(self, iterable, gone, send):
+        # One pool hop per chunk, so a slow download does not pin a thread between chunks
+        loop = asyncio.get_running_loop()
+        iterator = iter(iterable)
+        try:
+            while not gone.done():
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(self.executor, iterable.close)
+
+    async def _send_events(self, events, gone, send):
+        # Waits on the loop for the next event; a disconnect cancels the wait at once
+        try:
+            while True:
+                step = asyncio.ensure_future(events.__anext__())
+                await asyncio.wait({step, gone}, return_when=asyncio.FIRST_COMPLETED)
+                if not step.done():
+                    step.cancel()
+                    await asyncio.gather(step, return_exceptions=True)
+                    break
+                try:
+                    chunk = step.result()
+                except StopAsyncIteration:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            await events.aclose()
+
+
+async def disconnected(receive):
+    """Returns once the client has gone away"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_busy(send):
+    await send({
+        'type': 'http.response.start',
+        'status': 503,
+        'headers': [(b'content-type', b'application/json'), (b'retry-after', b'1')]
+    })
+    await send({'type': 'http.response.body', 'body': b'{"error":"Server busy, retry shortly"}'})
+
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP request scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+app = AsgiApp(flask_app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard API through an ASGI server")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Threads running the Flask app")
+    parser.add_argument('--warm-up', action='store_true',
+                        help="Precompute the default dashboard panels before reporting ready")
+    parser.add_argument('--allow-ingest', action='store_true',
+                        help=f"Serve POST /api/ingest, which appends to the dataset (also {ALLOW_INGEST_ENV}=1)")
+    parser.add_argument('--allow-profiling', action='store_true',
+                        help=f"Answer ?profile=1 with a cProfile summary of the request (also {ALLOW_PROFILING_ENV}=1)")
+    args = parser.parse_args()
+    if args.allow_ingest:
+        enable_ingest()
+    if args.allow_profiling:
+        enable_profiling()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is not installed: pip install uvicorn (or run the asgi:app module with another ASGI server)")
+        return 1
+
+    prepare_in_background(warm=args.warm_up)
+    print(f"Server starting on http://localhost:{args.port} (ASGI, {args.workers} worker threads)")
+    uvicorn.run(AsgiApp(flask_app, workers=args.workers), host=args.host, port=args.port, log_level='warning')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,212 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+
+class CachedDataset:
+    """One loaded dataset plus the structures derived from it at load time.
+
+    Columns are pulled from the underlying source on first use and kept, so
+    ``select()`` only ever materializes the columns a caller asks for.
+    ``derived()`` memoizes small results computed from this exact content.
+    """
+
+    # Most recently used derived results kept per dataset
+    DERIVED_ENTRIES = 256
+
+    def __init__(self, source, signature):
+        self.source = source
+        self.signature = signature
+        self.artifacts = {}
+        self._columns = {}
+        self._frame = None
+        self._derived = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Stable identifier for this exact content of the source file"""
+        mtime_ns, size = self.signature
+        return f"{mtime_ns:x}-{size:x}"
+
+    @property
+    def updated_at(self):
+        """When the source file was last modified, as an ISO timestamp"""
+        return datetime.fromtimestamp(self.signature[0] / 1e9).isoformat()
+
+    @property
+    def columns(self):
+        return self.source.columns
+
+    @property
+    def rows(self):
+        return self.source.rows
+
+    def select(self, columns=None):
+        """Frame holding just ``columns`` (every column when None), in dataset order"""
+        if columns is None:
+            if self._frame is None:
+                self._frame = self._assemble(self.source.columns)
+            return self._frame
+        return self._assemble([col for col in self.source.columns if col in columns])
+
+    @property
+    def frame(self):
+        return self.select()
+
+    def derived(self, key, compute):
+        """``compute()``, memoized under ``key`` for as long as this dataset version lives.
+
+        Results are shared between requests, so callers must not modify them.
+        """
+        with self._lock:
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key]
+
+        value = compute()
+        with self._lock:
+            self._derived[key] = value
+            while len(self._derived) > self.DERIVED_ENTRIES:
+                self._derived.popitem(last=False)
+        return value
+
+    def clear_derived(self):
+        """Drop every memoized derived result; returns how many there were"""
+        with self._lock:
+            dropped = len(self._derived)
+            self._derived.clear()
+        return dropped
+
+    def _assemble(self, names):
+        with self._lock:
+            for name in names:
+                if name not in self._columns:
+                    self._columns[name] = self.source.read(name)
+        if not names:
+            return pd.DataFrame(index=pd.RangeIndex(self.source.rows))
+        return pd.DataFrame({name: self._columns[name] for name in names}, copy=False)
+
+
+class DatasetCache:
+    """Shared, read-only cache of parsed datasets keyed on file path.
+
+    An entry is reused for as long as the file's mtime and size are unchanged,
+    so every request after the first one skips the CSV parse entirely. Frames
+    handed out by the cache are shared between requests and must not be
+    modified in place - use ``df.assign(...)`` or work on a copy instead.
+
+    ``loader`` returns a column source for a path (``.columns``, ``.rows`` and
+    ``.read(column)``). ``builders`` maps an artifact name to a function of
+    the loaded ``CachedDataset``; each one runs once per (re)load and its
+    result is stored on the entry, so derived structures are always in step
+    with the data they came from.
+
+    When the reloaded source reports that it only appends rows to the cached
+    one (``source.extends(old_source)`` returns the old row count), artifacts
+    with an entry in ``extenders`` are updated from the new rows instead of
+    rebuilt: ``extend(old_artifact, new_dataset, start)``. An extender that
+    raises ValueError falls back to the full build.
+    """
+
+    def __init__(self, loader, builders=None, extenders=None):
+        self._loader = loader
+        self._builders = builders or {}
+        self._extenders = extenders or {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.appends = 0
+
+    def get(self, path):
+        """Return the cached dataset for ``path``, (re)loading it if the file changed"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        # Loading happens under the lock so concurrent requests for a cold or
+        # stale entry wait for one parse instead of each running their own
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+
+            previous = entry
+            entry = CachedDataset(self._loader(path), signature)
+            start = self._appended_from(previous, entry)
+            if start is not None:
+                self.appends += 1
+
+            for name, build in self._builders.items():
+                extend = self._extenders.get(name)
+                if start is not None and extend is not None and name in previous.artifacts:
+                    try:
+                        entry.artifacts[name] = extend(previous.artifacts[name], entry, start)
+                        continue
+                    except ValueError as e:
+                        print(f"Rebuilding {name} after append: {e}")
+                entry.artifacts[name] = build(entry)
+            self._entries[path] = entry
+            return entry
+
+    def peek(self, path):
+        """The cached dataset for ``path`` when it is loaded and current, else None - never loads.
+
+        Doesn't wait for the lock, so it answers at once even while a load is running.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        entry = self._entries.get(path)
+        if entry is None or entry.signature != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return entry
+
+    @property
+    def artifact_names(self):
+        """Names of the structures built alongside every loaded dataset"""
+        return list(self._builders)
+
+    @staticmethod
+    def _appended_from(previous, entry):
+        """Row count of ``previous`` when ``entry`` holds the same rows plus appended ones"""
+        if previous is None:
+            return None
+        extends = getattr(entry.source, 'extends', None)
+        return extends(previous.source) if extends is not None else None
+
+    def invalidate(self, path=None):
+        """Drop one cached entry, or every entry when no path is given"""
+        with self._lock:
+            if path is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                dropped = 1 if self._entries.pop(path, None) is not None else 0
+        return dropped
+
+    def stats(self):
+        """Counters for the health endpoint"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'appends': self.appends
+            }
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+
+EMPTY_POSITIONS = np.empty(0, dtype=np.intp)
+# Rows sorted at a time while indexing, which bounds the sort's temporary arrays
+SORT_CHUNK_ROWS = 1 << 20
+# Spare capacity a value's positions get when an append outgrows them, as a fraction of their size
+SPARE_FRACTION = 0.25
+
+
+class DataIndex:
+    """Lookup structures over a date-sorted business frame.
+
+    Dates are kept as a sorted datetime64 array, so a date range (or a year,
+    which is derived from the date) becomes two binary searches that bound a
+    contiguous slice of rows. Each categorical column maps every value to the
+    sorted row positions holding it, so an equality filter is a dictionary
+    lookup and several filters combine by intersecting position arrays.
+
+    The dates are the frame's own array (memory-mapped from the snapshot),
+    but the positions are private to each process: one per row and indexed
+    column, stored as int32 while the row count allows.
+    """
+
+    CATEGORICAL = ('department', 'region')
+    COLUMNS = ('date',) + CATEGORICAL
+
+    def __init__(self, dates, categories, buffers=None):
+        self.dates = dates
+        self.categories = categories
+        # {column: {value: PositionBuffer}} behind the positions of values appended to
+        self._buffers = buffers or {}
+
+    @classmethod
+    def build(cls, df):
+        """Index a frame that is already sorted by date"""
+        if df.empty or 'date' not in df.columns:
+            return cls(np.empty(0, dtype='datetime64[ns]'), {})
+
+        dates = _date_array(df['date'])
+        if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+            raise ValueError("DataIndex requires a frame sorted by date")
+
+        dtype = _position_dtype(len(df))
+        categories = {
+            column: _positions_by_value(df[column], dtype=dtype)
+            for column in cls.CATEGORICAL if column in df.columns
+        }
+        return cls(dates, categories)
+
+    def extend(self, df, start):
+        """Index for ``df``, whose first ``start`` rows are the rows this index covers.
+
+        Only the appended rows are grouped. Their positions go after each
+        value's existing (smaller) ones, so both stay sorted, in a
+        PositionBuffer's spare capacity: the work is proportional to the
+        batch, plus an occasional copy of a value's positions when its buffer
+        grows (amortized over the appends, and always on the first one after
+        a build).
+        """
+        dates = _date_array(df['date'])
+        added = dates[start:]
+        if len(added) > 1 and (added[1:] < added[:-1]).any():
+            raise ValueError("DataIndex requires a frame sorted by date")
+        if len(added) and start and added[0] < self.dates[-1]:
+            raise ValueError("Appended rows are dated before existing rows")
+
+        dtype = _position_dtype(len(df))
+        categories, buffers = {}, {}
+        for column in self.CATEGORICAL:
+            if column not in df.columns:
+                continue
+            rows_by_value = dict(self.categories.get(column, {}))
+            buffer_by_value = dict(self._buffers.get(column, {}))
+            for value, rows in _positions_by_value(df[column].iloc[start:], offset=start, dtype=dtype).items():
+                if not len(rows):
+                    continue
+                existing = rows_by_value.get(value, EMPTY_POSITIONS)
+                buffer = buffer_by_value.get(value) or PositionBuffer(existing)
+                buffer_by_value[value] = buffer = buffer.append(len(existing), rows)
+                rows_by_value[value] = buffer.positions
+            categories[column] = rows_by_value
+            buffers[column] = buffer_by_value
+
+        return DataIndex(dates, categories, buffers)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def date_bounds(self, start=None, end=None):
+        """Half-open [lo, hi) row bounds for an inclusive date range"""
+        lo = 0 if start is None else self._search(start, 'left')
+        hi = len(self.dates) if end is None else self._search(end, 'right')
+        return lo, max(lo, hi)
+
+    def select(self, filters):
+        """Row positions matching the filters.
+
+        Returns a slice when only the date range is constrained, otherwise a
+        sorted array of positions.
+        """
+        lo, hi = self.date_bounds(filters.get('start_date'), filters.get('end_date'))
+
+        if 'year' in filters:
+            year = int(filters['year'])
+            lo = max(lo, self._search(f'{year}-01-01', 'left'))
+            hi = max(lo, min(hi, self._search(f'{year + 1}-01-01', 'left')))
+
+        positions = None
+        for column, rows_by_value in self.categories.items():
+            if column not in filters:
+                continue
+            rows = rows_by_value.get(filters[column], EMPTY_POSITIONS)
+            # Clip to the date slice before intersecting, both sides stay sorted
+            rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+            positions = rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+
+        return slice(lo, hi) if positions is None else positions
+
+    def _search(self, value, side):
+        # Match the array's unit, otherwise numpy converts the whole array per search
+        needle = pd.Timestamp(value).to_datetime64().astype(self.dates.dtype)
+        return int(np.searchsorted(self.dates, needle, side=side))
+
+
+class PositionBuffer:
+    """Sorted row positions with spare capacity after them, to append to without a copy.
+
+    ``positions`` is a view of the filled part. An append writes past it, so
+    views taken before - by the previous index version, which requests may
+    still be reading - never change. Appending to a shorter view than the
+    buffer holds (an older version) copies instead of overwriting the rows
+    appended since.
+    """
+
+    def __init__(self, positions):
+        self.data = positions
+        self.filled = len(positions)
+
+    @property
+    def positions(self):
+        return self.data[:self.filled]
+
+    def append(self, length, rows):
+        """Buffer holding the first ``length`` positions of this one followed by ``rows``"""
+        if length != self.filled:
+            return PositionBuffer(self.data[:length].copy()).append(length, rows)
+
+        filled = length + len(rows)
+        dtype = np.result_type(self.data.dtype, rows.dtype)
+        if filled > len(self.data) or dtype != self.data.dtype:
+            grown = np.empty(filled + int(filled * SPARE_FRACTION), dtype=dtype)
+            grown[:length] = self.data[:length]
+            self.data = grown
+        self.data[length:filled] = rows
+        self.filled = filled
+        return self
+
+
+def _date_array(values):
+    """datetime64 array of a date column, the column's own when it is already parsed"""
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        # pd.to_datetime would copy it, and the snapshot's column is shared between processes
+        return values.to_numpy()
+    return pd.to_datetime(values).to_numpy()
+
+
+def _position_dtype(rows):
+    """Smallest integer type that holds every position of a ``rows``-row frame"""
+    return np.int32 if rows <= np.iinfo(np.int32).max else np.intp
+
+
+def _positions_by_value(values, offset=0, dtype=np.intp):
+    """``{value: sorted row positions}`` for one column, positions shifted by ``offset``.
+
+    The rows are sorted a chunk at a time and each chunk's positions copied
+    into one array of ``dtype``, so the only full-length allocation is the
+    array that is kept (the values' positions are views of it).
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # The codes are already there (mapped from the snapshot), no need to factorize a copy
+        codes, uniques = values.array.codes, values.array.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    chunks = range(0, len(codes), SORT_CHUNK_ROWS)
+
+    # Rows per value, behind a first slot counting the missing values (code -1), which are dropped
+    counts = np.zeros(len(uniques) + 1, dtype=np.intp)
+    for start in chunks:
+        counts += np.bincount(codes[start:start + SORT_CHUNK_ROWS] + 1, minlength=len(counts))
+    ends = np.cumsum(counts[1:])
+    filled = ends - counts[1:]
+    order = np.empty(ends[-1] if len(ends) else 0, dtype=dtype)
+
+    for start in chunks:
+        chunk = codes[start:start + SORT_CHUNK_ROWS]
+        # A stable sort keeps positions ascending within each value, and the chunks come in row order
+        chunk_order = np.argsort(chunk, kind='stable')
+        bounds = np.cumsum(np.bincount(chunk + 1, minlength=len(counts)))
+        for code in np.flatnonzero(bounds[1:] > bounds[:-1]):
+            rows = chunk_order[bounds[code]:bounds[code + 1]]
+            order[filled[code]:filled[code] + len(rows)] = rows + (offset + start)
+            filled[code] += len(rows)
+
+    return dict(zip(uniques.tolist(), np.split(order, ends[:-1])))
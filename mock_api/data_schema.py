@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+# Storage kind for every column of enhanced_business_data.csv:
+#   datetime  - parsed once to datetime64
+#   category  - low-cardinality labels stored as ordered categoricals
+#   int       - whole numbers, downcast to the smallest integer type holding them
+#   score     - two-decimal metrics with a small range, float32 when that is lossless
+#   money     - currency amounts, kept float64 so cents survive large totals
+BUSINESS_SCHEMA = {
+    'date': 'datetime',
+    'quarter': 'category',
+    'year': 'int',
+    'quarter_num': 'int',
+    'department': 'category',
+    'region': 'category',
+    'revenue': 'money',
+    'expenses': 'money',
+    'employees': 'int',
+    'performance_score': 'score',
+    'simulated_customers': 'int',
+    'profit': 'money',
+    'profit_margin': 'score',
+    'customer_satisfaction': 'int',
+    'growth_rate': 'score',
+    'market_share': 'score',
+    'roi': 'score',
+    'expense_efficiency': 'score',
+    'revenue_per_customer': 'score',
+    'customer_growth_rate': 'score',
+    'nps': 'int',
+    'esg_score': 'score',
+    'rolling_revenue_avg': 'money',
+    'rolling_profit_avg': 'money',
+    'forecasted_revenue': 'money',
+    'profit_volatility': 'money',
+    'ytd_revenue': 'money',
+    'ytd_profit': 'money',
+    'region_competitiveness_index': 'score',
+    'profit_rank': 'int'
+}
+
+SCORE_DECIMALS = 2
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def apply_schema(df, schema=BUSINESS_SCHEMA):
+    """Convert a raw CSV frame to its compact typed representation.
+
+    Columns the schema does not know keep their parsed dtype. A downcast is
+    only applied when every value survives it unchanged, otherwise the column
+    falls back to the wide type.
+    """
+    columns = {}
+    for column in df.columns:
+        kind = schema.get(column)
+        values = df[column]
+
+        if kind == 'datetime':
+            values = pd.to_datetime(values)
+        elif kind == 'category':
+            # Ordered by label so min/max (e.g. the latest quarter) keep working
+            values = values.astype(pd.CategoricalDtype(sorted(values.dropna().unique()), ordered=True))
+        elif kind == 'int':
+            values = _downcast_int(values)
+        elif kind == 'score':
+            values = _downcast_score(values)
+        elif kind == 'money':
+            values = values.astype('float64')
+
+        columns[column] = values
+
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _downcast_int(values):
+    numeric = pd.to_numeric(values)
+    if numeric.isna().any() or not (numeric == np.round(numeric)).all():
+        return numeric
+    return pd.to_numeric(numeric.astype('int64'), downcast='integer')
+
+
+def _downcast_score(values):
+    wide = pd.to_numeric(values).astype('float64')
+    narrow = wide.astype('float32')
+    restored = narrow.astype('float64').round(SCORE_DECIMALS)
+    if np.array_equal(restored.to_numpy(), wide.round(SCORE_DECIMALS).to_numpy(), equal_nan=True):
+        return narrow
+    return wide
+
+
+def memory_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def widen(values):
+    """Wide (int64/float64) copy of a typed column for exact arithmetic"""
+    if values.dtype == np.float32:
+        # float32 only ever stores two-decimal scores, round off the float32 noise
+        return values.astype('float64').round(SCORE_DECIMALS)
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype('int64')
+    if pd.api.types.is_float_dtype(values):
+        return values.astype('float64')
+    return values
+
+
+def display_frame(df):
+    """Widen typed columns back to their CSV form for JSON and CSV output.
+
+    Dates become ``YYYY-MM-DD`` strings and float32 scores are rounded back to
+    the two decimals they were stored with, so responses look exactly as they
+    did when the frame held the raw CSV values.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime(DATE_FORMAT)
+        elif values.dtype == np.float32:
+            values = widen(values)
+        columns[column] = values
+
+    return pd.DataFrame(columns, index=df.index)
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Business dataset storage: CSV import and the columnar snapshot
+
+The CSV is the import format only. ``python mock_api/data_store.py snapshot``
+(or the first API start after the CSV changes) converts it into a snapshot
+directory next to it - one ``.npy`` file per column plus ``manifest.json`` -
+which later starts read without any text parsing, one column at a time.
+
+Snapshot columns are memory-mapped read-only, so every worker process serving
+the API shares one page-cache copy of the data instead of holding its own.
+
+Appended rows (see ``append_rows`` and ``ingest.py``) extend the ``.npy``
+files in place, so a batch costs O(batch) rather than a rewrite of the data.
+
+The manifest also lists the data's year (or quarter) partitions with their
+row ranges and summary stats, see ``partitions.py``.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from data_schema import apply_schema, display_frame, memory_bytes
+from derived import RAW_COLUMNS, derive_columns
+from partitions import DEFAULT_PARTITION_BY, PARTITION_BY, merge_partitions, partition_stats
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snapshot'
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'enhanced_business_data.csv')
+
+
+class FrameSource:
+    """Column source over a frame that is already in memory (the CSV path)"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.columns = list(frame.columns)
+        self.rows = len(frame)
+
+    def read(self, column):
+        return self.frame[column]
+
+
+class SnapshotSource:
+    """Column source over a snapshot directory, reading only requested columns.
+
+    With ``mmap`` (the default) each column is a read-only memory map of its
+    ``.npy`` file: nothing is copied into the process, pages are faulted in
+    from the shared page cache as they are touched, and the arrays are not
+    writeable, so no in-place change can reach the file other workers map.
+    """
+
+    def __init__(self, directory, manifest, mmap=True):
+        self.directory = directory
+        self.manifest = manifest
+        self.mmap = mmap
+        self.columns = list(manifest['columns'])
+        self.rows = manifest['rows']
+
+    def read(self, column):
+        spec = self.manifest['columns'][column]
+        values = np.load(
+            os.path.join(self.directory, spec['file']),
+            mmap_mode='r' if self.mmap else None,
+            allow_pickle=False
+        )
+        # Rows an append is still writing are past the manifest's count
+        values = values[:self.rows]
+
+        if spec['kind'] == 'categorical':
+            # The mapped codes are wrapped as-is, only the small dictionary is in memory
+            values = pd.Categorical.from_codes(values, categories=spec['categories'], ordered=spec['ordered'])
+
+        return pd.Series(values, name=column, copy=False)
+
+    def extends(self, other):
+        """Row count of ``other`` when this snapshot is ``other`` plus appended rows, else None"""
+        if not isinstance(other, SnapshotSource) or self.manifest.get('id') is None:
+            return None
+        if self.manifest['id'] != other.manifest.get('id') or self.rows < other.rows or self.columns != other.columns:
+            return None
+
+        for column, spec in self.manifest['columns'].items():
+            old = other.manifest['columns'][column]
+            if (spec['kind'], spec['dtype'], spec['file']) != (old['kind'], old['dtype'], old['file']):
+                return None
+            if spec['kind'] == 'categorical' and spec['categories'][:len(old['categories'])] != old['categories']:
+                return None
+        return other.rows
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(csv_path):
+    stat = os.stat(csv_path)
+    return {
+        'sha256': file_sha256(csv_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+
+def read_business_csv(path):
+    """Parse the CSV into the typed, date-sorted frame the API works on"""
+    print(f"Loading enhanced business data from {path}")
+    raw = pd.read_csv(path)
+    # A CSV of raw facts only gets its rolling, YTD, ratio and rank columns computed here
+    raw = derive_columns(raw)
+
+    # Dates parsed once, labels as categoricals, metrics downcast where lossless
+    df = apply_schema(raw)
+    print(f"Loaded {len(df)} rows: {memory_bytes(raw) / 1e6:.2f} MB as parsed, "
+          f"{memory_bytes(df) / 1e6:.2f} MB typed")
+    del raw
+
+    # Keep rows in date order so date filters resolve to contiguous slices
+    if 'date' in df.columns:
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    return df
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as handle:
+            return json.load(handle)
+    except (FileNotFoundError, NotADirectoryError, ValueError):
+        return None
+
+
+def is_fresh(manifest, csv_path):
+    """True when the snapshot was built from the CSV's current content"""
+    if manifest is None or manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        return False
+
+    source = manifest['source']
+    stat = os.stat(csv_path)
+    if stat.st_size != source['size']:
+        return False
+    if stat.st_mtime_ns == source['mtime_ns']:
+        return True
+
+    # Touched but possibly unchanged - the content hash decides (appends record none)
+    return source['sha256'] is not None and file_sha256(csv_path) == source['sha256']
+
+
+def write_snapshot(df, csv_path, fingerprint=None, partition_by=None):
+    """Write ``df`` as the snapshot for ``csv_path``, replacing any older one.
+
+    Columns are written into a temporary directory that is renamed into place
+    once complete, so a reader never sees a half-written snapshot: it finds
+    either the old one, the new one, or none (and falls back to the CSV).
+    Partitions are by ``partition_by``, else as in the snapshot being replaced.
+    """
+    partition_by = partition_by or snapshot_partition_by(csv_path)
+    fingerprint = fingerprint or source_fingerprint(csv_path)
+    staging = snapshot_staging(csv_path)
+
+    try:
+        columns = {}
+        for position, column in enumerate(df.columns):
+            values = df[column]
+            file_name = f"{position:03d}.npy"
+
+            if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+                spec = {'kind': 'numeric', 'dtype': str(values.dtype)}
+                array = values.to_numpy()
+            else:
+                # Labels are stored as integer codes plus a small dictionary
+                categorical = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+                spec = {
+                    'kind': 'categorical',
+                    'dtype': str(categorical.cat.codes.dtype),
+                    'categories': categorical.cat.categories.tolist(),
+                    'ordered': bool(categorical.cat.ordered)
+                }
+                array = categorical.cat.codes.to_numpy()
+
+            np.save(os.path.join(staging, file_name), np.ascontiguousarray(array), allow_pickle=False)
+            columns[column] = dict(spec, file=file_name)
+
+        partitions = None
+        if 'date' in df.columns:
+            parts = partition_stats(df['date'].to_numpy(), df.items(), partition_by)
+            partitions = {'by': partition_by, 'parts': parts}
+        return install_snapshot(staging, csv_path, snapshot_manifest(fingerprint, len(df), columns, partitions))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def snapshot_staging(csv_path):
+    """A new, empty directory to write the next snapshot of ``csv_path`` into"""
+    staging = f"{snapshot_path(csv_path)}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    return staging
+
+
+def snapshot_manifest(fingerprint, rows, columns, partitions=None):
+    """Manifest of a new snapshot: ``columns`` maps each column to its spec and file.
+
+    ``partitions`` is ``{'by': 'year' or 'quarter', 'parts': [...]}`` as made
+    by ``partition_stats``; a manifest without it gets its partitions computed
+    on load.
+    """
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        # Kept across in-place appends, so readers can tell an append from a rebuild
+        'id': uuid.uuid4().hex,
+        'source': fingerprint,
+        'rows': rows,
+        'columns': columns
+    }
+    if partitions is not None:
+        manifest['partitions'] = partitions
+    return manifest
+
+
+def snapshot_partition_by(csv_path):
+    """How the current snapshot of ``csv_path`` is partitioned, fresh or not (by year when there is none)"""
+    manifest = read_manifest(snapshot_path(csv_path)) or {}
+    return manifest.get('partitions', {}).get('by', DEFAULT_PARTITION_BY)
+
+
+def install_snapshot(staging, csv_path, manifest):
+    """Write the manifest into a completed staging directory and swap it in as the snapshot of ``csv_path``"""
+    target = snapshot_path(csv_path)
+    with open(os.path.join(staging, MANIFEST_NAME), 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+
+    retired = None
+    if os.path.exists(target):
+        retired = f"{target}.old-{uuid.uuid4().hex}"
+        os.rename(target, retired)
+    os.rename(staging, target)
+    if retired:
+        shutil.rmtree(retired, ignore_errors=True)
+    return target
+
+
+def append_rows(csv_path, batch):
+    """Append ``batch`` to the CSV and bring its snapshot up to date.
+
+    ``batch`` holds every dataset column, typed as ``read_business_csv``
+    returns them, and is dated no earlier than the existing rows. When the
+    snapshot is fresh and every new value fits its stored column - same
+    dtype, new labels sorting after the existing ones - each ``.npy`` file
+    is extended in place and 'append' is returned. Otherwise the snapshot is
+    rebuilt from the CSV and the result is 'rebuild'.
+
+    Column files are extended before the CSV and the manifest last, so until
+    the manifest is replaced readers see exactly the old rows. Writers must
+    be serialized; readers can keep using the snapshot throughout.
+    """
+    source = open_snapshot(csv_path)
+    update = None if source is None else _snapshot_update(source, batch)
+    if update is not None:
+        try:
+            for array, spec in update.values():
+                _append_npy(os.path.join(source.directory, spec['file']), array, source.rows)
+        except (OSError, ValueError) as e:
+            print(f"Could not append to the snapshot, rebuilding it: {e}")
+            update = None
+
+    _append_csv(csv_path, batch)
+
+    if update is not None:
+        try:
+            _write_appended_manifest(source, update, batch, csv_path)
+            return 'append'
+        except OSError as e:
+            print(f"Could not append to the snapshot, rebuilding it: {e}")
+
+    fingerprint = source_fingerprint(csv_path)
+    try:
+        write_snapshot(read_business_csv(csv_path), csv_path, fingerprint)
+    except OSError as e:
+        print(f"Could not write business data snapshot: {e}")
+    return 'rebuild'
+
+
+def _append_csv(csv_path, batch):
+    with open(csv_path, 'rb') as handle:
+        header = next(csv.reader([handle.readline().decode('utf-8')]))
+        handle.seek(0, os.SEEK_END)
+        missing_newline = False
+        if handle.tell():
+            handle.seek(-1, os.SEEK_END)
+            missing_newline = handle.read(1) != b'\n'
+
+    text = display_frame(batch[header]).to_csv(header=False, index=False, lineterminator='\n')
+    # One write, so a concurrent parse never sees part of the batch
+    with open(csv_path, 'ab') as handle:
+        handle.write((('\n' if missing_newline else '') + text).encode('utf-8'))
+
+
+def _snapshot_update(source, batch):
+    """``{column: (stored array, spec)}`` for the batch, or None when it cannot be appended"""
+    if sorted(batch.columns) != sorted(source.columns):
+        return None
+    if 'date' in batch.columns and source.rows:
+        if batch['date'].min() < source.read('date').iloc[-1]:
+            return None
+
+    update = {}
+    for column in source.columns:
+        spec = source.manifest['columns'][column]
+        dtype = np.dtype(spec['dtype'])
+        values = batch[column]
+
+        if spec['kind'] == 'categorical':
+            labels = values.astype(object)
+            added = sorted(set(labels) - set(spec['categories']))
+            # New labels must sort last, or existing codes would change meaning
+            if added and spec['categories'] and added[0] <= spec['categories'][-1]:
+                return None
+            categories = spec['categories'] + added
+            if len(categories) - 1 > np.iinfo(dtype).max:
+                return None
+            codes = pd.Categorical(labels, categories=categories).codes.astype(dtype)
+            update[column] = (codes, dict(spec, categories=categories))
+            continue
+
+        array = values.to_numpy()
+        with np.errstate(invalid='ignore', over='ignore'):
+            stored = array.astype(dtype)
+            restored = stored.astype(array.dtype)
+        if dtype == np.float32:
+            # Scores are stored as float32 only when they survive at two decimals
+            lossless = np.array_equal(restored.round(2), array.round(2))
+        else:
+            lossless = np.array_equal(restored, array)
+        if not lossless:
+            return None
+        update[column] = (stored, spec)
+
+    return update
+
+
+def _write_appended_manifest(source, update, batch, csv_path):
+    stat = os.stat(csv_path)
+    manifest = dict(
+        source.manifest,
+        source={'sha256': None, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+        rows=source.rows + len(batch),
+        columns={column: update[column][1] for column in source.columns}
+    )
+
+    # Only the batch's partitions are summarized: a year it continues is combined with the batch's part
+    partitions = manifest.pop('partitions', None)
+    if partitions is not None and 'date' in batch.columns:
+        try:
+            added = partition_stats(batch['date'].to_numpy(), batch.items(), partitions['by'], source.rows)
+            manifest['partitions'] = dict(partitions, parts=merge_partitions(partitions['parts'], added))
+        except ValueError as e:
+            # Readers compute the partitions from the data instead
+            print(f"Could not update the snapshot's partitions: {e}")
+    _replace_manifest(source.directory, manifest)
+
+
+def repartition_snapshot(source, partition_by):
+    """Recompute the partitions of an existing snapshot by ``partition_by``, in place; returns them"""
+    dates = source.read('date').to_numpy()
+    columns = ((column, source.read(column)) for column in source.columns if column != 'date')
+    partitions = {'by': partition_by, 'parts': partition_stats(dates, columns, partition_by)}
+    _replace_manifest(source.directory, dict(source.manifest, partitions=partitions))
+    return partitions
+
+
+def _replace_manifest(directory, manifest):
+    # Written beside the old one and renamed over it, so readers see one or the other
+    staging = os.path.join(directory, f"{MANIFEST_NAME}.tmp-{uuid.uuid4().hex}")
+    with open(staging, 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(staging, os.path.join(directory, MANIFEST_NAME))
+
+
+def _append_npy(path, array, rows):
+    """Append to a 1-d ``.npy`` file holding ``rows`` values, then rewrite its shape in place.
+
+    ``np.save`` pads the header with room for the length to grow, so the new
+    header is the same size and the existing data never moves.
+    """
+    with open(path, 'r+b') as handle:
+        version = np.lib.format.read_magic(handle)
+        if version != (1, 0):
+            raise ValueError(f"Unsupported .npy version {version} in {path}")
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(handle)
+        offset = handle.tell()
+        if len(shape) != 1 or shape[0] < rows or dtype != array.dtype:
+            raise ValueError(f"{path} does not match the snapshot manifest")
+
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': fortran_order,
+            'shape': (rows + len(array),)
+        })
+        if header.tell() != offset:
+            raise ValueError(f"No room to grow the header of {path}")
+
+        # Anything past the manifest's rows is left over from an interrupted append
+        handle.seek(offset + rows * dtype.itemsize)
+        handle.write(np.ascontiguousarray(array).tobytes())
+        handle.truncate()
+        handle.flush()
+        os.fsync(handle.fileno())
+
+        handle.seek(0)
+        handle.write(header.getvalue())
+
+
+def read_snapshot(csv_path, columns=None, mmap=True):
+    """Read a fresh snapshot as a frame, loading only ``columns`` when given.
+
+    Returns None when there is no snapshot or it is stale.
+    """
+    source = open_snapshot(csv_path, mmap=mmap)
+    if source is None:
+        return None
+
+    names = source.columns if columns is None else [col for col in source.columns if col in columns]
+    return pd.DataFrame({col: source.read(col) for col in names}, copy=False)
+
+
+def open_snapshot(csv_path, mmap=True):
+    directory = snapshot_path(csv_path)
+    manifest = read_manifest(directory)
+    if not is_fresh(manifest, csv_path):
+        return None
+    return SnapshotSource(directory, manifest, mmap=mmap)
+
+
+def open_business_data(csv_path):
+    """Column source for the dataset: the snapshot when fresh, else the CSV.
+
+    A CSV fallback also (re)writes the snapshot and then serves from its
+    memory map, so only the first start after the CSV changes pays the parse
+    and every process ends up sharing the same mapped pages.
+    """
+    source = open_snapshot(csv_path)
+    if source is not None:
+        print(f"Memory-mapping business data snapshot from {source.directory}")
+        return source
+
+    fingerprint = source_fingerprint(csv_path)
+    df = read_business_csv(csv_path)
+    try:
+        directory = write_snapshot(df, csv_path, fingerprint)
+        print(f"Wrote business data snapshot to {directory}")
+    except OSError as e:
+        print(f"Could not write business data snapshot: {e}")
+        return FrameSource(df)
+
+    return SnapshotSource(directory, read_manifest(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Business dataset storage tools")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    snapshot = subcommands.add_parser('snapshot', help="Convert the CSV into a columnar snapshot")
+    snapshot.add_argument('csv', nargs='?', default=DEFAULT_CSV_PATH)
+    snapshot.add_argument('--force', action='store_true', help="Rebuild even when the snapshot is fresh")
+    snapshot.add_argument('--partition-by', choices=PARTITION_BY,
+                          help="Partition the rows by year or quarter (default: as before, else by year)")
+
+    partitions = subcommands.add_parser('partitions', help="List the snapshot's partitions, or repartition it")
+    partitions.add_argument('csv', nargs='?', default=DEFAULT_CSV_PATH)
+    partitions.add_argument('--by', choices=PARTITION_BY, help="Recompute the partitions by year or quarter")
+
+    facts = subcommands.add_parser('facts', help="Write the CSV's raw facts only; the rest is derived on load")
+    facts.add_argument('csv', nargs='?', default=DEFAULT_CSV_PATH)
+    facts.add_argument('--output', help="Where to write the facts CSV (default: <csv>.facts.csv)")
+
+    args = parser.parse_args()
+
+    if args.command == 'facts':
+        output = args.output or os.path.splitext(args.csv)[0] + '.facts.csv'
+        raw = pd.read_csv(args.csv)
+        raw[[col for col in raw.columns if col in RAW_COLUMNS]].to_csv(output, index=False)
+        print(f"Wrote {output}: {os.path.getsize(output) / 1e6:.2f} MB, was {os.path.getsize(args.csv) / 1e6:.2f} MB")
+        return 0
+
+    if args.command == 'partitions':
+        source = open_snapshot(args.csv)
+        if source is None:
+            print(f"No fresh snapshot for {args.csv}; run the snapshot command first")
+            return 1
+        partitions = source.manifest.get('partitions')
+        if args.by or partitions is None:
+            partitions = repartition_snapshot(source, args.by or DEFAULT_PARTITION_BY)
+        print(f"{len(partitions['parts'])} partitions by {partitions['by']}:")
+        for part in partitions['parts']:
+            print(f"  {part['key']:<8} rows {part['start']:,} to {part['start'] + part['rows'] - 1:,}"
+                  f"  {part['min_date'][:10]} to {part['max_date'][:10]}")
+        return 0
+
+    if args.command == 'snapshot':
+        if not args.force and open_snapshot(args.csv) is not None:
+            print(f"Snapshot is up to date: {snapshot_path(args.csv)}")
+            return 0
+        fingerprint = source_fingerprint(args.csv)
+        df = read_business_csv(args.csv)
+        print(f"Wrote {write_snapshot(df, args.csv, fingerprint, args.partition_by)}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,302 @@
+"""
+Derived business metrics, computed from the raw facts of each row
+
+Everything but ``RAW_COLUMNS`` follows from the facts: calendar fields from
+the date, ratios from the row itself, rolling and year-to-date figures from
+the earlier rows of the same (department, region) series, and market share
+and profit ranks from the other regions' rows on the same date. A source
+holding only the raw facts is completed by ``derive_columns`` when loaded.
+
+New rows are completed by ``DerivedMetrics``, which keeps each series'
+running state - the last ``WINDOW`` values, running sums, a windowed Welford
+mean/variance and the year-to-date totals - so a row costs O(1) however long
+its series already is.
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from data_schema import BUSINESS_SCHEMA
+
+# Facts a row is made of; every other business column is derived from them
+RAW_COLUMNS = (
+    'date', 'department', 'region', 'revenue', 'expenses', 'employees', 'performance_score',
+    'simulated_customers', 'customer_satisfaction', 'nps', 'esg_score'
+)
+SERIES_KEYS = ('department', 'region')
+# A cross-section: the rows that market share and ranks compare against each other
+GROUP_KEYS = ('date', 'region')
+# Rows (quarters) the rolling metrics look back over
+WINDOW = 4
+
+CALENDAR_COLUMNS = ('quarter', 'year', 'quarter_num')
+ROW_COLUMNS = ('profit', 'profit_margin', 'roi', 'expense_efficiency', 'revenue_per_customer')
+SERIES_COLUMNS = (
+    'growth_rate', 'customer_growth_rate', 'rolling_revenue_avg', 'rolling_profit_avg',
+    'forecasted_revenue', 'profit_volatility', 'ytd_revenue', 'ytd_profit'
+)
+GROUP_COLUMNS = ('market_share', 'region_competitiveness_index', 'profit_rank')
+DERIVED_COLUMNS = CALENDAR_COLUMNS + ROW_COLUMNS + SERIES_COLUMNS + GROUP_COLUMNS
+
+DECIMALS = 2
+
+
+def calendar_columns(dates):
+    """quarter (``2024-Q3``), year and quarter_num of datetime64 ``dates``"""
+    year = dates.dt.year.astype('int64')
+    quarter_num = dates.dt.quarter.astype('int64')
+    return {
+        'quarter': year.astype(str) + '-Q' + quarter_num.astype(str),
+        'year': year,
+        'quarter_num': quarter_num
+    }
+
+
+def row_columns(df):
+    """Per-row ratios; ``profit`` is revenue minus expenses unless the frame has it"""
+    profit = df['profit'] if 'profit' in df.columns else (df['revenue'] - df['expenses']).round(DECIMALS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns = {
+            'profit': profit,
+            'profit_margin': profit / df['revenue'] * 100,
+            'roi': profit / df['expenses'] * 100,
+            'expense_efficiency': df['revenue'] / df['expenses'],
+            'revenue_per_customer': df['revenue'] / df['simulated_customers']
+        }
+    return {name: _finite(values).round(DECIMALS) for name, values in columns.items()}
+
+
+def group_columns(df):
+    """Market share and profit-margin rank of each row among its date's rows in the same region"""
+    keys = [df[key] for key in GROUP_KEYS]
+    revenue = df['revenue'].groupby(keys, observed=True)
+    # Ranked on the unrounded margin, so rounding cannot introduce ties
+    rank = (df['profit'] / df['revenue']).groupby(keys, observed=True).rank(ascending=False, method='min')
+    return {
+        'market_share': _finite(df['revenue'] / revenue.transform('sum') * 100).round(DECIMALS),
+        'region_competitiveness_index': (rank / revenue.transform('count') * 100).round(DECIMALS),
+        'profit_rank': rank.fillna(0).astype('int64')
+    }
+
+
+def derive_columns(df):
+    """``df`` with every derived column it lacks computed from its raw facts (whole columns at once).
+
+    Derived columns the frame already has are kept as they are. Columns come
+    back in the business schema's order, as in the full CSV.
+
+    The facts are rounded to the cent, while the shipped CSV derived its
+    columns from the unrounded values. Recomputed profit, rolling averages,
+    forecast and volatility can therefore be one cent off it, and YTD
+    totals, which sum up to four rounded quarters, two cents. Ratios,
+    growth rates, shares and ranks match it exactly.
+    """
+    missing = [col for col in DERIVED_COLUMNS if col not in df.columns]
+    if not missing or not all(col in df.columns for col in RAW_COLUMNS):
+        return df
+
+    df = df.reset_index(drop=True)
+    dates = pd.to_datetime(df['date'])
+    columns = {}
+    columns.update(calendar_columns(dates))
+    columns.update(row_columns(df))
+
+    # Series statistics run over each series in date order
+    facts = pd.DataFrame({
+        'revenue': df['revenue'].astype('float64'),
+        'profit': columns['profit'].astype('float64'),
+        'customers': df['simulated_customers'].astype('float64'),
+        'year': columns['year']
+    }).iloc[np.argsort(dates.to_numpy(), kind='stable')]
+    series = facts.groupby([df[key] for key in SERIES_KEYS], sort=False, observed=True)
+
+    def rolling(column, statistic):
+        return series[column].transform(lambda values: getattr(values.rolling(WINDOW, min_periods=1), statistic)())
+
+    columns['growth_rate'] = _finite(series['revenue'].pct_change() * 100).round(DECIMALS)
+    columns['customer_growth_rate'] = _finite(series['customers'].pct_change() * 100).round(DECIMALS)
+    rolling_revenue = rolling('revenue', 'mean')
+    columns['rolling_revenue_avg'] = rolling_revenue.round(DECIMALS)
+    columns['rolling_profit_avg'] = rolling('profit', 'mean').round(DECIMALS)
+    # Next row's forecast is this row's rolling average; a series' first row forecasts itself
+    forecast = rolling_revenue.groupby([df[key] for key in SERIES_KEYS], sort=False, observed=True).shift(1)
+    columns['forecasted_revenue'] = forecast.fillna(facts['revenue']).round(DECIMALS)
+    columns['profit_volatility'] = rolling('profit', 'std').fillna(0).round(DECIMALS)
+    by_year = facts.groupby([df[key] for key in SERIES_KEYS] + [facts['year']], sort=False, observed=True)
+    columns['ytd_revenue'] = by_year['revenue'].cumsum().round(DECIMALS)
+    columns['ytd_profit'] = by_year['profit'].cumsum().round(DECIMALS)
+
+    columns.update(group_columns(df.assign(date=dates, profit=columns['profit'])))
+
+    print(f"Derived {len(missing)} columns from the raw facts: {', '.join(missing)}")
+    completed = df.assign(**{col: columns[col] for col in missing})
+    order = [col for col in BUSINESS_SCHEMA if col in completed.columns]
+    return completed[order + [col for col in completed.columns if col not in order]]
+
+
+class SeriesState:
+    """Running state of one (department, region) series, advanced in O(1) per row"""
+
+    __slots__ = (
+        'revenues', 'profits', 'revenue_sum', 'profit_mean', 'profit_m2',
+        'last_revenue', 'last_customers', 'year', 'ytd_revenue', 'ytd_profit'
+    )
+
+    def __init__(self):
+        self.revenues = deque()
+        self.profits = deque()
+        self.revenue_sum = 0.0
+        # Welford mean and sum of squared deviations over the profits window
+        self.profit_mean = 0.0
+        self.profit_m2 = 0.0
+        self.last_revenue = None
+        self.last_customers = None
+        self.year = None
+        self.ytd_revenue = 0.0
+        self.ytd_profit = 0.0
+
+    def copy(self):
+        state = SeriesState()
+        for name in self.__slots__:
+            setattr(state, name, getattr(self, name))
+        state.revenues = deque(self.revenues)
+        state.profits = deque(self.profits)
+        return state
+
+    def push(self, revenue, profit, customers, year):
+        """Add the series' next row and return its SERIES_COLUMNS values"""
+        forecast = self.revenue_sum / len(self.revenues) if self.revenues else revenue
+        growth = _pct_change(self.last_revenue, revenue)
+        customer_growth = _pct_change(self.last_customers, customers)
+
+        if len(self.revenues) == WINDOW:
+            self.revenue_sum -= self.revenues.popleft()
+            self._remove_profit(self.profits.popleft())
+        self.revenues.append(revenue)
+        self.revenue_sum += revenue
+        self.profits.append(profit)
+        self._add_profit(profit)
+
+        if year != self.year:
+            self.year, self.ytd_revenue, self.ytd_profit = year, 0.0, 0.0
+        self.ytd_revenue += revenue
+        self.ytd_profit += profit
+        self.last_revenue, self.last_customers = revenue, customers
+
+        count = len(self.profits)
+        volatility = math.sqrt(max(self.profit_m2, 0.0) / (count - 1)) if count > 1 else 0.0
+        return (
+            growth, customer_growth, self.revenue_sum / count, self.profit_mean,
+            forecast, volatility, self.ytd_revenue, self.ytd_profit
+        )
+
+    def _add_profit(self, value):
+        count = len(self.profits)
+        delta = value - self.profit_mean
+        self.profit_mean += delta / count
+        self.profit_m2 += delta * (value - self.profit_mean)
+
+    def _remove_profit(self, value):
+        # Called after the value left the deque, so len() is the remaining count
+        count = len(self.profits)
+        if count == 0:
+            self.profit_mean = self.profit_m2 = 0.0
+            return
+        delta = value - self.profit_mean
+        self.profit_mean -= delta / count
+        self.profit_m2 -= delta * (value - self.profit_mean)
+
+
+class DerivedMetrics:
+    """Per-series running state for completing appended rows.
+
+    ``build`` seeds every series from its last ``WINDOW`` rows and its
+    current year's totals, ``extend`` advances the state past rows already
+    in the data and ``derive`` completes a batch of new rows. Instances are
+    never modified, so one can be shared between requests while the next
+    is built.
+    """
+
+    COLUMNS = ('date',) + SERIES_KEYS + ('revenue', 'profit', 'simulated_customers')
+
+    def __init__(self, series):
+        # {(department, region): SeriesState}
+        self.series = series
+
+    @classmethod
+    def build(cls, df):
+        if df.empty or not all(col in df.columns for col in cls.COLUMNS):
+            return cls({})
+
+        keys = [df[key] for key in SERIES_KEYS]
+        metrics = cls({}).extend(df.groupby(keys, sort=False, observed=True).tail(WINDOW))
+
+        facts = _series_facts(df)
+
+        # The tail only covers part of the year: take the YTD totals from every row of it
+        totals = facts.groupby(keys + [facts['year']], observed=True)[['revenue', 'profit']].sum()
+        for (department, region, year), (revenue, profit) in zip(totals.index, totals.to_numpy()):
+            state = metrics.series[(str(department), str(region))]
+            if state.year == year:
+                state.ytd_revenue, state.ytd_profit = float(revenue), float(profit)
+        return metrics
+
+    def extend(self, rows):
+        """State after ``rows`` (date-ordered, following the data); this instance is left unchanged"""
+        series = dict(self.series)
+        self._stream(_series_facts(rows), series)
+        return DerivedMetrics(series)
+
+    def derive(self, batch):
+        """SERIES_COLUMNS of new rows (date-ordered, following the data), as a frame on ``batch``'s index"""
+        values = self._stream(_series_facts(batch), dict(self.series))
+        return pd.DataFrame(values, index=batch.index, columns=list(SERIES_COLUMNS)).round(DECIMALS)
+
+    def _stream(self, facts, series):
+        copied = set()
+        values = []
+        for department, region, revenue, profit, customers, year in zip(
+            facts['department'], facts['region'], facts['revenue'],
+            facts['profit'], facts['customers'], facts['year']
+        ):
+            key = (str(department), str(region))
+            if key not in copied:
+                # Copy on first touch so the shared state stays as it was
+                series[key] = series[key].copy() if key in series else SeriesState()
+                copied.add(key)
+            values.append(series[key].push(revenue, profit, customers, year))
+        return values
+
+
+def complete_batch(batch, metrics):
+    """Every derived column of validated new rows: ``batch`` holds the raw facts (and maybe profit)"""
+    columns = calendar_columns(batch['date'])
+    columns.update(row_columns(batch))
+    batch = batch.assign(**columns)
+    series = metrics.derive(batch)
+    batch = batch.assign(**{col: series[col] for col in SERIES_COLUMNS})
+    return batch.assign(**group_columns(batch))
+
+
+def _series_facts(df):
+    return pd.DataFrame({
+        'department': df['department'],
+        'region': df['region'],
+        'revenue': df['revenue'].astype('float64'),
+        'profit': df['profit'].astype('float64'),
+        'customers': df['simulated_customers'].astype('float64'),
+        'year': pd.to_datetime(df['date']).dt.year.astype('int64')
+    }, index=df.index)
+
+
+def _pct_change(previous, value):
+    if not previous:
+        return 0.0
+    return (value / previous - 1) * 100
+
+
+def _finite(values):
+    return values.replace([np.inf, -np.inf], np.nan).fillna(0)
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Synthetic business datasets of any size with the 30 columns of the business CSV
+
+``python mock_api/generate_data.py --rows 10000000 --output data/large.csv``
+lays rows out like enhanced_business_data.csv: one row per period and
+(department, region) series, periods daily, monthly or quarterly from
+``--start``. The raw facts are drawn with plausible correlations - each
+series has its own revenue level, growth and seasonality, expenses follow
+the department's cost ratio, headcount and customers grow with revenue,
+performance tracks the margin and satisfaction and NPS track performance -
+and every other column is derived from them as in ``derived.py``.
+
+Rows are generated in chunks of whole periods, spread over worker processes,
+so memory stays bounded by ``--chunk-rows`` per worker however many rows are
+written. Each chunk has its own random stream; what it needs from earlier
+periods (the rolling window, the previous period and the year-to-date totals)
+comes from a first pass over revenue, expenses and customers only.
+
+The output is a CSV, or with ``--format snapshot`` the API's columnar
+snapshot next to a header-only CSV, which the API serves without parsing
+any text.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_schema import BUSINESS_SCHEMA
+from data_store import install_snapshot, snapshot_manifest, snapshot_staging, source_fingerprint
+from derived import DECIMALS, WINDOW, row_columns
+from partitions import DEFAULT_PARTITION_BY, PARTITION_BY, merge_partitions, partition_stats
+
+DEPARTMENTS = ['AI', 'Android', 'Cloud', 'Hardware', 'Maps', 'Search', 'YouTube']
+REGIONS = ['Asia Pacific', 'Europe', 'Middle East & Africa', 'North America', 'South America']
+
+# Months between period starts (0: one period per day)
+GRANULARITIES = {'daily': 0, 'monthly': 1, 'quarterly': 3}
+# Share of a quarter's revenue, expenses and customers one period books
+PERIOD_SHARE = {'daily': 4 / 365.25, 'monthly': 1 / 3, 'quarterly': 1.0}
+
+# Growth saturates at this factor, so centuries of periods keep plausible sizes
+TREND_LIMIT = 4
+
+DEFAULT_CHUNK_ROWS = 500_000
+# Columns stored as codes into the plan's sorted labels
+LABEL_COLUMNS = ('quarter', 'department', 'region')
+# Latest date a datetime64[ns] column can hold
+LAST_DATE = np.datetime64(pd.Timestamp.max.normalize().date(), 'D')
+
+
+def department_names(count):
+    """The real department names, padded with numbered ones past seven"""
+    return DEPARTMENTS[:count] + [f'Dept {i:03d}' for i in range(len(DEPARTMENTS), count)]
+
+
+def region_names(count):
+    """The real region names, padded with numbered ones past five"""
+    return REGIONS[:count] + [f'Region {i:03d}' for i in range(len(REGIONS), count)]
+
+
+class DatasetPlan:
+    """Everything that fixes a generated dataset: its size, layout and the character of each series.
+
+    Row ``i`` belongs to period ``i // series`` and series ``i % series``,
+    which is department ``s // regions`` in region ``s % regions`` - date
+    order, as the API keeps its rows. Periods are cut into chunks of
+    ``chunk_periods``, each drawn from its own random stream, so a chunk can
+    be generated on its own in any process and the output does not depend
+    on the number of workers.
+    """
+
+    def __init__(self, rows, departments=len(DEPARTMENTS), regions=len(REGIONS), granularity='quarterly',
+                 start='2020-01-01', seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+        if rows < 1 or departments < 1 or regions < 1:
+            raise ValueError("rows, departments and regions must be at least 1")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        self.rows = rows
+        self.departments = department_names(departments)
+        self.regions = region_names(regions)
+        self.series = departments * regions
+        self.granularity = granularity
+        self.seed = seed
+        self.periods = -(-rows // self.series)
+        self.chunk_periods = max(1, chunk_rows // self.series)
+        self.chunks = -(-self.periods // self.chunk_periods)
+
+        # Monthly and quarterly periods start on the first day of their month or quarter
+        start = np.datetime64(pd.Timestamp(start).date(), 'D')
+        if GRANULARITIES[granularity]:
+            month = start.astype('datetime64[M]').astype('int64')
+            start = np.datetime64(int(month - month % GRANULARITIES[granularity]), 'M').astype('datetime64[D]')
+        self.start = start
+
+        last = self.dates(self.periods - 1, self.periods)[0]
+        if last > LAST_DATE:
+            raise ValueError(
+                f"{rows:,} rows over {self.series} series need {granularity} periods until {last}, past the "
+                f"last date pandas can hold ({LAST_DATE}); add departments or regions, or use longer periods"
+            )
+        self.end = last
+
+        # Every quarter label the dates fall in, sorted as the schema's categoricals are
+        self.first_quarter, last_quarter = _quarter_keys(np.array([self.start, last]))
+        self.quarters = [f'{key // 4}-Q{key % 4 + 1}' for key in range(self.first_quarter, last_quarter + 1)]
+
+        rng = np.random.default_rng([seed, 0])
+        d = np.repeat(np.arange(departments), regions)
+        r = np.tile(np.arange(regions), departments)
+        # Quarterly revenue: a department level scaled by the region's weight
+        level = rng.lognormal(np.log(5e7), 0.35, departments)[d] * rng.uniform(0.6, 1.4, regions)[r]
+        self.level = level
+        self.growth = rng.uniform(-0.01, 0.08, departments)[d] + rng.normal(0, 0.01, self.series)
+        self.season_amplitude = rng.uniform(0.03, 0.12, self.series)
+        self.season_phase = rng.uniform(0, 2 * np.pi, regions)[r]
+        self.cost_ratio = np.clip(rng.uniform(0.35, 0.65, departments)[d] + rng.normal(0, 0.03, self.series), 0.32, 0.68)
+        self.employees = np.clip(level / rng.uniform(2000, 6000, departments)[d], 100, 1e6)
+        self.customers = np.clip(level / rng.uniform(20, 150, departments)[d], 1000, 1e9)
+        self.esg = rng.uniform(65, 95, self.series)
+
+    def chunk_range(self, chunk):
+        """First and last-plus-one period of ``chunk``"""
+        first = chunk * self.chunk_periods
+        return first, min(self.periods, first + self.chunk_periods)
+
+    def dates(self, first, last):
+        """Start dates (datetime64[D]) of periods ``first`` to ``last - 1``"""
+        offsets = np.arange(first, last)
+        months = GRANULARITIES[self.granularity]
+        if not months:
+            return self.start + offsets
+        return (self.start.astype('datetime64[M]') + offsets * months).astype('datetime64[D]')
+
+
+class SeriesCarry:
+    """What a chunk needs from the periods before it, per series.
+
+    The last ``WINDOW`` periods' revenue, profit and customers (fewer at the
+    start of the data) and the year-to-date revenue and profit of ``year``.
+    """
+
+    def __init__(self, revenue, profit, customers, ytd_revenue, ytd_profit, year):
+        self.revenue = revenue
+        self.profit = profit
+        self.customers = customers
+        self.ytd_revenue = ytd_revenue
+        self.ytd_profit = ytd_profit
+        self.year = year
+
+    @classmethod
+    def start(cls, plan):
+        empty = np.empty((0, plan.series))
+        zeros = np.zeros(plan.series)
+        return cls(empty, empty, empty, zeros, zeros, None)
+
+    def advance(self, plan, chunk):
+        """The carry after ``chunk``, from its revenue, expenses and customers alone"""
+        first, last = plan.chunk_range(chunk)
+        revenue, expenses, customers, _ = core_facts(plan, chunk)
+        profit = (revenue - expenses).round(DECIMALS)
+        years = plan.dates(first, last).astype('datetime64[Y]').astype('int64') + 1970
+        ytd_revenue = year_to_date(revenue, years, self.ytd_revenue, self.year)
+        ytd_profit = year_to_date(profit, years, self.ytd_profit, self.year)
+        return SeriesCarry(
+            np.concatenate([self.revenue, revenue])[-WINDOW:],
+            np.concatenate([self.profit, profit])[-WINDOW:],
+            np.concatenate([self.customers, customers])[-WINDOW:],
+            ytd_revenue[-1], ytd_profit[-1], int(years[-1])
+        )
+
+
+def core_facts(plan, chunk):
+    """Revenue, expenses and customers of a chunk's periods, shape (periods, series), plus its random stream.
+
+    These are the first draws from the chunk's stream, so the first pass can
+    stop here and the full generation continues with the same stream.
+    """
+    first, last = plan.chunk_range(chunk)
+    rng = np.random.default_rng([plan.seed, 1, chunk])
+    shape = (last - first, plan.series)
+
+    dates = plan.dates(first, last)
+    months = (dates.astype('datetime64[M]').astype('int64') % 12)[:, None]
+    trend = _trend(plan, first, last)
+    season = 1 + plan.season_amplitude * np.sin(2 * np.pi * months / 12 + plan.season_phase)
+    share = PERIOD_SHARE[plan.granularity]
+
+    revenue = (plan.level * share * trend * season * rng.lognormal(-0.0072, 0.12, shape)).round(DECIMALS)
+    expenses = (revenue * np.clip(plan.cost_ratio + rng.normal(0, 0.04, shape), 0.3, 0.7)).round(DECIMALS)
+    customers = np.maximum(1, np.rint(plan.customers * trend * rng.lognormal(0, 0.08, shape))).astype('int64')
+    return revenue, expenses, customers, rng
+
+
+def year_to_date(values, years, carry, carry_year):
+    """Running totals of ``values`` (periods, series) that restart each year, continuing ``carry`` in ``carry_year``"""
+    totals = np.empty_like(values)
+    starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+    for begin, end in zip(starts, np.r_[starts[1:], len(years)]):
+        if begin == 0 and years[0] == carry_year:
+            totals[begin:end] = np.cumsum(np.concatenate([carry[None], values[begin:end]]), axis=0)[1:]
+        else:
+            totals[begin:end] = np.cumsum(values[begin:end], axis=0)
+    return totals
+
+
+def rolling(history, values):
+    """Mean and sample std over the last ``WINDOW`` periods of each series.
+
+    Returns both for every period of ``values`` plus the mean of the period
+    before it (None at the start of the data). ``history`` holds the
+    preceding periods: all of them when fewer than ``WINDOW``.
+    """
+    stack = np.concatenate([history, values])
+    length = len(stack)
+    sums = np.zeros_like(stack)
+    counts = np.zeros((length, 1))
+    for lag in range(WINDOW):
+        sums[lag:] += stack[:length - lag]
+        counts[lag:] += 1
+    mean = sums / counts
+
+    squares = np.zeros_like(stack)
+    for lag in range(WINDOW):
+        squares[lag:] += (stack[:length - lag] - mean[lag:]) ** 2
+    # A single value has no spread; the derived column reports 0 there
+    std = np.sqrt(squares / np.maximum(counts - 1, 1))
+    std[counts[:, 0] < 2] = 0
+
+    start = len(history)
+    return mean[start:], std[start:], mean[start - 1] if start else None
+
+
+def pct_change(history, values):
+    """Change from each series' previous period in percent, 0 for its first one"""
+    previous = np.concatenate([history[-1:], values[:-1]]) if len(history) else values[:-1]
+    change = np.zeros_like(values, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change[len(values) - len(previous):] = (values[len(values) - len(previous):] / previous - 1) * 100
+    change[~np.isfinite(change)] = 0
+    return change
+
+
+def group_columns(plan, revenue, profit, valid):
+    """Market share, competitiveness index and profit rank among each period's departments per region"""
+    shape = (len(revenue), len(plan.departments), len(plan.regions))
+    revenue = revenue.reshape(shape)
+    valid = valid.reshape(shape)
+    totals = np.where(valid, revenue, 0).sum(axis=1, keepdims=True)
+    counts = valid.sum(axis=1, keepdims=True)
+
+    # Rank on the unrounded margin, highest first, ties sharing their lowest rank
+    margin = np.where(valid, profit.reshape(shape) / revenue, -np.inf)
+    order = np.argsort(-margin, axis=1, kind='stable')
+    ranked = np.take_along_axis(margin, order, axis=1)
+    changed = np.ones(shape, dtype=bool)
+    changed[:, 1:] = ranked[:, 1:] != ranked[:, :-1]
+    positions = np.where(changed, np.arange(shape[1])[None, :, None], 0)
+    rank = np.empty(shape, dtype='int64')
+    np.put_along_axis(rank, order, np.maximum.accumulate(positions, axis=1) + 1, axis=1)
+
+    # Regions with no rows in a partial last period divide by zero; those cells are cut off
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = revenue / totals * 100
+        index = rank / counts * 100
+    share[~np.isfinite(share)] = 0
+    return {
+        'market_share': share.reshape(len(revenue), -1).round(DECIMALS),
+        'region_competitiveness_index': index.reshape(len(revenue), -1).round(DECIMALS),
+        'profit_rank': rank.reshape(len(revenue), -1)
+    }
+
+
+def chunk_columns(plan, chunk, carry):
+    """Every column of a chunk's rows in schema order: flat arrays, labels as codes into the plan's sorted names"""
+    first, last = plan.chunk_range(chunk)
+    revenue, expenses, customers, rng = core_facts(plan, chunk)
+    shape = revenue.shape
+    profit = (revenue - expenses).round(DECIMALS)
+    margin = profit / revenue
+    performance = np.clip(70 + 75 * (margin - 0.3) + rng.normal(0, 3, shape), 70, 100).round(DECIMALS)
+    satisfaction = np.clip(np.rint(performance + rng.normal(0, 5, shape)), 70, 100).astype('int64')
+    nps = np.clip(np.rint((satisfaction - 70) * 3.3 + rng.normal(0, 12, shape)), 0, 100).astype('int64')
+    employees = np.maximum(1, np.rint(
+        plan.employees * _trend(plan, first, last) * rng.lognormal(0, 0.03, shape)
+    )).astype('int64')
+    esg = np.clip(plan.esg + rng.normal(0, 2, shape), 60, 100).round(DECIMALS)
+
+    dates = plan.dates(first, last)
+    years = dates.astype('datetime64[Y]').astype('int64') + 1970
+    quarter_keys = _quarter_keys(dates)
+
+    revenue_mean, _, previous_mean = rolling(carry.revenue, revenue)
+    profit_mean, profit_std, _ = rolling(carry.profit, profit)
+    # Next period's forecast is this period's rolling average; a series' first period forecasts itself
+    forecast = np.concatenate([revenue[:1] if previous_mean is None else previous_mean[None], revenue_mean[:-1]])
+
+    # The data's last period may hold only the first series
+    rows = min(plan.rows, last * plan.series) - first * plan.series
+    valid = np.arange(len(dates) * plan.series).reshape(shape) < rows
+
+    columns = {
+        'date': np.repeat(dates, plan.series),
+        'quarter': np.repeat(quarter_keys - plan.first_quarter, plan.series),
+        'year': np.repeat(years, plan.series),
+        'quarter_num': np.repeat(quarter_keys % 4 + 1, plan.series),
+        'department': np.tile(np.repeat(_sorted_codes(plan.departments), len(plan.regions)), len(dates)),
+        'region': np.tile(np.tile(_sorted_codes(plan.regions), len(plan.departments)), len(dates)),
+        'revenue': revenue,
+        'expenses': expenses,
+        'employees': employees,
+        'performance_score': performance,
+        'simulated_customers': customers,
+        'customer_satisfaction': satisfaction,
+        'growth_rate': pct_change(carry.revenue, revenue).round(DECIMALS),
+        'customer_growth_rate': pct_change(carry.customers, customers).round(DECIMALS),
+        'nps': nps,
+        'esg_score': esg,
+        'rolling_revenue_avg': revenue_mean.round(DECIMALS),
+        'rolling_profit_avg': profit_mean.round(DECIMALS),
+        'forecasted_revenue': forecast.round(DECIMALS),
+        'profit_volatility': profit_std.round(DECIMALS),
+        'ytd_revenue': year_to_date(revenue, years, carry.ytd_revenue, carry.year).round(DECIMALS),
+        'ytd_profit': year_to_date(profit, years, carry.ytd_profit, carry.year).round(DECIMALS)
+    }
+    columns.update(group_columns(plan, revenue, profit, valid))
+
+    # Per-row ratios with the same formulas as rows derived on load
+    facts = pd.DataFrame({
+        'revenue': revenue.ravel(), 'expenses': expenses.ravel(),
+        'simulated_customers': customers.ravel(), 'profit': profit.ravel()
+    })
+    columns.update({name: values.to_numpy() for name, values in row_columns(facts).items()})
+
+    return {column: np.ravel(columns[column])[:rows] for column in BUSINESS_SCHEMA}
+
+
+def column_dtypes(plan):
+    """Snapshot dtype of every column, fixed up front from the bounds the generator keeps to"""
+    dtypes = {}
+    for column, kind in BUSINESS_SCHEMA.items():
+        if kind == 'datetime':
+            dtypes[column] = np.dtype('datetime64[ns]')
+        elif kind == 'score':
+            dtypes[column] = np.dtype('float32')
+        elif kind == 'money':
+            dtypes[column] = np.dtype('float64')
+        elif kind == 'int':
+            dtypes[column] = np.dtype('int32')
+    for column, labels in (('quarter', plan.quarters), ('department', plan.departments), ('region', plan.regions)):
+        dtypes[column] = pd.Categorical.from_codes([], categories=sorted(labels)).codes.dtype
+    dtypes.update(
+        year=_int_dtype(int(str(plan.end)[:4])),
+        quarter_num=np.dtype('int8'),
+        customer_satisfaction=np.dtype('int8'),
+        nps=np.dtype('int8'),
+        profit_rank=_int_dtype(len(plan.departments))
+    )
+    return dtypes
+
+
+def chunk_csv(plan, chunk, carry):
+    """A chunk's rows as CSV text, formatted like the business CSV"""
+    columns = chunk_columns(plan, chunk, carry)
+    labels = {
+        'quarter': np.array(plan.quarters, dtype=object),
+        'department': np.array(sorted(plan.departments), dtype=object),
+        'region': np.array(sorted(plan.regions), dtype=object)
+    }
+    frame = pd.DataFrame({
+        column: labels[column][values] if column in labels else values
+        for column, values in columns.items()
+    })
+    frame['date'] = np.datetime_as_string(columns['date'], unit='D')
+    return frame.to_csv(header=False, index=False, lineterminator='\n').encode('utf-8')
+
+
+def write_chunk_snapshot(plan, chunk, carry, directory, files, dtypes, partition_by):
+    """Write a chunk's rows into their place in the preallocated snapshot column files.
+
+    Returns the chunk's partitions, summarized from the values as stored.
+    """
+    columns = chunk_columns(plan, chunk, carry)
+    offset = plan.chunk_range(chunk)[0] * plan.series
+    stored_columns = {}
+    for column, values in columns.items():
+        dtype = dtypes[column]
+        if dtype == np.float32:
+            stored = values.astype(dtype)
+            # Scores are bounded well inside the range float32 keeps at two decimals
+            if not np.array_equal(stored.astype('float64').round(DECIMALS), values.round(DECIMALS)):
+                raise ValueError(f"{column} does not fit float32 at {DECIMALS} decimals")
+            values = stored
+        target = np.load(os.path.join(directory, files[column]), mmap_mode='r+')
+        target[offset:offset + len(values)] = values
+        target.flush()
+        del target
+        stored_columns[column] = values
+
+    metrics = ((column, values) for column, values in stored_columns.items() if column not in LABEL_COLUMNS)
+    return partition_stats(stored_columns['date'], metrics, partition_by, offset)
+
+
+def carries(plan):
+    """The carry into each chunk in order: the first pass, one chunk ahead of whoever consumes it"""
+    carry = SeriesCarry.start(plan)
+    for chunk in range(plan.chunks):
+        yield chunk, carry
+        if chunk + 1 < plan.chunks:
+            carry = carry.advance(plan, chunk)
+
+
+def run_chunks(plan, task, args=(), workers=1):
+    """``task(plan, chunk, carry, *args)`` for every chunk, results in chunk order.
+
+    With more than one worker the chunks run in spawned processes, at most
+    two per worker queued at a time so finished results never pile up.
+    """
+    if workers <= 1:
+        for chunk, carry in carries(plan):
+            yield task(plan, chunk, carry, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        pending = deque()
+        for chunk, carry in carries(plan):
+            pending.append(executor.submit(task, plan, chunk, carry, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_csv(plan, csv_path, workers=1):
+    """Write the dataset as a CSV, through a temporary file that replaces ``csv_path`` when complete"""
+    staging = f"{csv_path}.tmp-{uuid.uuid4().hex}"
+    written = 0
+    try:
+        with open(staging, 'wb') as handle:
+            handle.write((','.join(BUSINESS_SCHEMA) + '\n').encode('utf-8'))
+            for text in run_chunks(plan, chunk_csv, workers=workers):
+                handle.write(text)
+                written = _progress(plan, written, text.count(b'\n'))
+        os.replace(staging, csv_path)
+    except BaseException:
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+    return csv_path
+
+
+def write_snapshot_dataset(plan, csv_path, workers=1, partition_by=DEFAULT_PARTITION_BY):
+    """Write the dataset as the columnar snapshot of a header-only CSV at ``csv_path``.
+
+    Column files are allocated at full size first, then each chunk fills its
+    own rows, so no process ever holds more than a chunk. The chunks' partition
+    summaries are combined into the manifest's.
+    """
+    with open(csv_path, 'w') as handle:
+        handle.write(','.join(BUSINESS_SCHEMA) + '\n')
+    fingerprint = source_fingerprint(csv_path)
+
+    dtypes = column_dtypes(plan)
+    staging = snapshot_staging(csv_path)
+    try:
+        files = {}
+        manifest_columns = {}
+        for position, column in enumerate(BUSINESS_SCHEMA):
+            files[column] = f"{position:03d}.npy"
+            np.lib.format.open_memmap(
+                os.path.join(staging, files[column]), mode='w+', dtype=dtypes[column], shape=(plan.rows,)
+            ).flush()
+            if column in LABEL_COLUMNS:
+                labels = {'quarter': plan.quarters, 'department': plan.departments, 'region': plan.regions}[column]
+                spec = {'kind': 'categorical', 'dtype': str(dtypes[column]), 'categories': sorted(labels), 'ordered': True}
+            else:
+                spec = {'kind': 'numeric', 'dtype': str(dtypes[column])}
+            manifest_columns[column] = dict(spec, file=files[column])
+
+        written = 0
+        parts = []
+        for added in run_chunks(plan, write_chunk_snapshot, (staging, files, dtypes, partition_by), workers):
+            parts = merge_partitions(parts, added)
+            written = _progress(plan, written, sum(part['rows'] for part in added))
+        partitions = {'by': partition_by, 'parts': parts}
+        return install_snapshot(
+            staging, csv_path, snapshot_manifest(fingerprint, plan.rows, manifest_columns, partitions)
+        )
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _progress(plan, written, rows):
+    done = written + rows
+    # A line per tenth of the rows, not per chunk
+    if plan.chunks > 1 and done * 10 // plan.rows > written * 10 // plan.rows:
+        print(f"  {done:,} / {plan.rows:,} rows")
+    return done
+
+
+def _trend(plan, first, last):
+    """Each series' growth since the start: compounding at first, levelling off at ``TREND_LIMIT`` times either way"""
+    years = ((plan.dates(first, last) - plan.start).astype('int64') / 365.25)[:, None]
+    limit = np.log(TREND_LIMIT)
+    return np.exp(limit * np.tanh(plan.growth * years / limit))
+
+
+def _quarter_keys(dates):
+    months = dates.astype('datetime64[M]').astype('int64')
+    return (months // 12 + 1970) * 4 + months % 12 // 3
+
+
+def _sorted_codes(names):
+    """Code of each name in the sorted list of names"""
+    return np.argsort(np.argsort(names, kind='stable'), kind='stable')
+
+
+def _int_dtype(largest):
+    for dtype in (np.int8, np.int16, np.int32):
+        if largest <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype('int64')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic business dataset of any size")
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--output', required=True, help="CSV path (with --format snapshot, the header-only CSV)")
+    parser.add_argument('--format', choices=('csv', 'snapshot'), default='csv')
+    parser.add_argument('--partition-by', choices=PARTITION_BY, default=DEFAULT_PARTITION_BY,
+                        help="How the snapshot's partitions split the rows")
+    parser.add_argument('--departments', type=int, default=len(DEPARTMENTS))
+    parser.add_argument('--regions', type=int, default=len(REGIONS))
+    parser.add_argument('--granularity', choices=list(GRANULARITIES), default='quarterly')
+    parser.add_argument('--start', default='2020-01-01', help="First period's date")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows generated at a time per worker, which bounds the memory used")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (1 generates in this process)")
+    args = parser.parse_args()
+
+    try:
+        plan = DatasetPlan(args.rows, args.departments, args.regions, args.granularity, args.start, args.seed,
+                           args.chunk_rows)
+    except ValueError as e:
+        print(f"Cannot generate this dataset: {e}")
+        return 1
+
+    print(f"Generating {plan.rows:,} rows: {plan.periods:,} {plan.granularity} periods from {plan.start} to "
+          f"{plan.end}, {len(plan.departments)} departments x {len(plan.regions)} regions, "
+          f"{plan.chunks} chunks on {args.workers} worker(s)")
+    start = time.perf_counter()
+    if args.format == 'csv':
+        write_csv(plan, args.output, args.workers)
+        print(f"Wrote {args.output}: {os.path.getsize(args.output) / 1e6:,.1f} MB")
+    else:
+        print(f"Wrote {write_snapshot_dataset(plan, args.output, args.workers, args.partition_by)}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
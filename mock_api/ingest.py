@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Incremental ingestion of new business data rows
+
+``python mock_api/ingest.py batch.csv`` (or ``POST /api/ingest``) validates a
+batch of new rows - their raw facts, see ``derived.RAW_COLUMNS`` - derives
+every other column from them and appends it to the dataset. The snapshot's
+column files grow in place, and every serving process picks the rows up on
+its next request by extending its date index, rollup cube and derived-metric
+state from the new rows alone instead of reloading.
+
+Ingestion is append-only: a batch must be dated after the latest row already
+in the dataset (a date's rows are compared with each other for market share
+and ranks, so they arrive together), and only one writer may append at a time.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CachedDataset
+from data_schema import BUSINESS_SCHEMA, DATE_FORMAT
+from data_store import DEFAULT_CSV_PATH, append_rows, open_business_data
+from derived import DERIVED_COLUMNS, GROUP_COLUMNS, DerivedMetrics, complete_batch
+
+# Derived only when the batch leaves it out; other derived values are always recomputed
+DEFAULT_COLUMNS = ('profit',)
+LABEL_COLUMNS = ('department', 'region')
+
+
+def parse_batch(body, content_type):
+    """Raw frame from a request body: CSV text, or JSON records (a list or ``{"rows": [...]}``)"""
+    if content_type in ('text/csv', 'application/csv'):
+        try:
+            return pd.read_csv(io.BytesIO(body))
+        except (ValueError, pd.errors.ParserError) as e:
+            raise ValueError(f"Invalid CSV batch: {e}")
+
+    try:
+        payload = json.loads(body or b'null')
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON batch: {e}")
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list) or not all(isinstance(row, dict) for row in payload):
+        raise ValueError("Expected a JSON list of row objects, or {\"rows\": [...]}")
+    return pd.DataFrame.from_records(payload)
+
+
+def prepare_batch(raw, dataset, metrics=None):
+    """Validate raw new rows and return them typed and complete, in dataset column order.
+
+    Series metrics continue from ``metrics`` (the dataset's DerivedMetrics),
+    built from the dataset when not given. Raises ValueError describing the
+    problem when the batch is rejected.
+    """
+    if raw.empty:
+        raise ValueError("The batch has no rows")
+
+    columns = list(dataset.columns)
+    unknown = [col for col in raw.columns if col not in columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(map(str, unknown))}")
+    missing = [
+        col for col in columns
+        if col not in raw.columns and col not in DERIVED_COLUMNS + DEFAULT_COLUMNS
+    ]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    values = {}
+    dates = pd.to_datetime(raw['date'].astype(str), format=DATE_FORMAT, errors='coerce')
+    _check(dates.notna(), 'date', "is not a YYYY-MM-DD date")
+    values['date'] = dates
+
+    latest = dataset.select(['date'])['date'].iloc[-1] if dataset.rows else None
+    # Rows sharing the latest date would change that date's market shares and ranks
+    shared_date = any(col in columns for col in GROUP_COLUMNS) and dates.min() == latest
+    if latest is not None and (dates.min() < latest or shared_date):
+        raise ValueError(f"Rows must be dated after the latest existing row ({latest:{DATE_FORMAT}})")
+
+    for column in LABEL_COLUMNS:
+        labels = raw[column].astype(str).str.strip()
+        _check(raw[column].notna() & (labels != ''), column, "is empty")
+        values[column] = labels
+
+    for column in columns:
+        if column in values or column not in raw.columns:
+            continue
+        if column in DERIVED_COLUMNS and column not in DEFAULT_COLUMNS:
+            continue
+        numbers = pd.to_numeric(raw[column], errors='coerce').astype('float64')
+        _check(np.isfinite(numbers), column, "is not a number")
+        if BUSINESS_SCHEMA.get(column) == 'int':
+            _check(numbers == np.round(numbers), column, "is not a whole number")
+            numbers = numbers.astype('int64')
+        values[column] = numbers
+
+    batch = pd.DataFrame(values).sort_values('date', kind='stable').reset_index(drop=True)
+    if metrics is None:
+        metrics = DerivedMetrics.build(dataset.select(DerivedMetrics.COLUMNS))
+    batch = complete_batch(batch, metrics)
+    return batch[columns]
+
+
+def _check(valid, column, problem):
+    valid = np.asarray(valid)
+    if not valid.all():
+        rows = np.flatnonzero(~valid)
+        shown = ', '.join(str(row) for row in rows[:5]) + (', ...' if len(rows) > 5 else '')
+        raise ValueError(f"{column} {problem} in row(s) {shown}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append a batch of new rows to the business dataset")
+    parser.add_argument('batch', help="CSV file of new rows ('-' reads standard input)")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="Dataset CSV to append to")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(sys.stdin if args.batch == '-' else args.batch)
+    stat = os.stat(args.csv)
+    dataset = CachedDataset(open_business_data(args.csv), (stat.st_mtime_ns, stat.st_size))
+
+    try:
+        batch = prepare_batch(raw, dataset)
+    except ValueError as e:
+        print(f"Rejected batch: {e}")
+        return 1
+
+    mode = append_rows(args.csv, batch)
+    print(f"Appended {len(batch)} rows ({mode} of the snapshot), {dataset.rows + len(batch)} rows in total")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from serialization import dumps
+
+# Sent on otherwise idle streams so proxies keep them open and dead clients are noticed
+KEEPALIVE = b': keepalive\n\n'
+# Reconnect delay a browser EventSource uses after the stream drops, in milliseconds
+RETRY_MS = 3000
+
+
+def sse_event(event, data, event_id=None):
+    """One encoded Server-Sent Event with a JSON payload"""
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines.append(f'event: {event}')
+    lines.append('data: ' + dumps(data).decode('utf-8'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def record_delta(old, new):
+    """Changes between two lists of chart records, keyed on their text fields.
+
+    Returns ``{"upsert": [...], "remove": [...]}`` - records that are new or
+    changed, and the keys (as ``{field: value}``) of records that are gone -
+    or None when nothing changed.
+    """
+    def key(record):
+        return tuple((name, value) for name, value in record.items() if isinstance(value, str))
+
+    before = {key(record): record for record in old or []}
+    after = {key(record): record for record in new or []}
+    upsert = [record for k, record in after.items() if before.get(k) != record]
+    remove = [dict(k) for k in before if k not in after]
+    if not upsert and not remove:
+        return None
+    return {'upsert': upsert, 'remove': remove}
+
+
+class LiveChannel:
+    """One live feed - a filter set - with its latest state and recent encoded events"""
+
+    # Events kept for streams that fall behind between two wake-ups
+    HISTORY = 64
+
+    def __init__(self, key):
+        self.key = key
+        self.state = {}
+        self.listeners = 0
+        self.sequence = 0
+        self.events = deque(maxlen=self.HISTORY)
+        self.snapshot = None
+        # Guards the events and snapshot, held only briefly; updating is held while they are computed
+        self.condition = threading.Condition()
+        self.updating = threading.RLock()
+        # Callbacks of asyncio streams, called (from any thread) on every publish
+        self.waiters = set()
+
+    def publish(self, events, snapshot):
+        """Encode ``[(event, data)]`` once for every listener and notify them"""
+        with self.condition:
+            for event, data in events:
+                self.sequence += 1
+                self.events.append((self.sequence, sse_event(event, data, self.sequence)))
+            self.snapshot = sse_event('snapshot', snapshot, self.sequence)
+            self.condition.notify_all()
+            for notify in self.waiters:
+                notify()
+
+    def since(self, position):
+        """``(sequence, body)`` for a listener that has seen events up to ``position``.
+
+        The body is the encoded events it has not seen, the snapshot when it
+        fell further behind than the history holds, or None when it is up to date.
+        """
+        with self.condition:
+            pending = [body for sequence, body in self.events if sequence > position]
+            if self.events and self.events[0][0] > position + 1:
+                return self.sequence, self.snapshot
+            return self.sequence, b''.join(pending) or None
+
+
+class LiveHub:
+    """Server-Sent Event fan-out where each update is computed once per channel.
+
+    Streams with the same key share a channel. One watcher thread calls
+    ``refresh(key, state)`` for every channel with listeners each
+    ``interval`` seconds; it returns the ``[(event, data)]`` to push, an
+    empty list when nothing changed, so idle channels cost one cheap check
+    per interval however many clients listen. ``snapshot(state)`` is the
+    full current payload a newly connected stream starts from. Encoded events
+    are shared by every stream of the channel.
+    """
+
+    def __init__(self, refresh, snapshot, interval=1.0, keepalive=15.0):
+        self.refresh = refresh
+        self.snapshot = snapshot
+        self.interval = interval
+        self.keepalive = keepalive
+        self.computations = 0
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def stream(self, key):
+        """Event stream for one client: the current snapshot, then updates and keepalives.
+
+        The LiveStream is a plain iterable for WSGI servers, which hold a thread
+        per client while it waits; ASGI servers iterate it asynchronously instead.
+        """
+        return LiveStream(self, key)
+
+    def events(self, key):
+        """Encoded events for one client, waiting in the calling thread"""
+        channel = self._join(key)
+        try:
+            position, snapshot = self._start(channel)
+            yield f'retry: {RETRY_MS}\n\n'.encode('utf-8') + snapshot
+
+            while True:
+                with channel.condition:
+                    channel.condition.wait_for(lambda: channel.sequence > position, timeout=self.keepalive)
+                position, body = channel.since(position)
+                yield body or KEEPALIVE
+        finally:
+            self._leave(channel)
+
+    async def async_events(self, key):
+        """events() for an asyncio server: waits on the event loop, so an idle client costs no thread"""
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # the loop is closed; the stream is gone with it
+
+        channel = self._join(key)
+        with channel.condition:
+            channel.waiters.add(notify)
+        try:
+            # The first listener's compute is pandas work: run it on the loop's executor
+            position, snapshot = await loop.run_in_executor(None, self._start, channel)
+            yield f'retry: {RETRY_MS}\n\n'.encode('utf-8') + snapshot
+
+            while True:
+                try:
+                    await asyncio.wait_for(wake.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    pass
+                # Cleared before reading, so an event published meanwhile wakes the next wait
+                wake.clear()
+                position, body = channel.since(position)
+                yield body or KEEPALIVE
+        finally:
+            with channel.condition:
+                channel.waiters.discard(notify)
+            self._leave(channel)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'listeners': sum(channel.listeners for channel in self._channels.values()),
+                'computations': self.computations
+            }
+
+    def _join(self, key):
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = self._channels[key] = LiveChannel(key)
+            channel.listeners += 1
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='live-hub', daemon=True)
+                self._watcher.start()
+        return channel
+
+    def _start(self, channel):
+        # The first listener computes the initial state; later ones reuse it
+        with channel.updating:
+            if channel.snapshot is None:
+                self._update(channel)
+        with channel.condition:
+            return channel.sequence, channel.snapshot
+
+    def _leave(self, channel):
+        with self._lock:
+            channel.listeners -= 1
+            if channel.listeners == 0 and self._channels.get(channel.key) is channel:
+                del self._channels[channel.key]
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                channels = [channel for channel in self._channels.values() if channel.listeners]
+            for channel in channels:
+                try:
+                    self._update(channel)
+                except Exception as e:
+                    print(f"Error refreshing live channel {channel.key}: {e}")
+
+    def _update(self, channel):
+        # Under the channel's (reentrant) update lock, so a channel is never refreshed twice at once
+        with channel.updating:
+            events = self.refresh(channel.key, channel.state)
+            if events or channel.snapshot is None:
+                with self._lock:
+                    self.computations += 1
+                channel.publish(events, self.snapshot(channel.state))
+
+
+class LiveStream:
+    """One client's stream of a LiveHub channel.
+
+    Iterating it runs ``hub.events(key)`` in the calling thread; ``async for``
+    runs ``hub.async_events(key)`` on the event loop. Nothing joins the
+    channel until iteration starts, and ``close()`` leaves it.
+    """
+
+    def __init__(self, hub, key):
+        self.hub = hub
+        self.key = key
+        self._events = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._events is None:
+            self._events = self.hub.events(self.key)
+        return next(self._events)
+
+    def __aiter__(self):
+        return self.hub.async_events(self.key)
+
+    def close(self):
+        if self._events is not None:
+            self._events.close()
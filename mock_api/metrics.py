@@ -0,0 +1,204 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Request latencies counted into ``BUCKETS``, plus their count and sum"""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class RequestTrace:
+    """Phase timings and counters of one request.
+
+    Spans nest, and each phase is charged only its own time: a span opened
+    inside another one is subtracted from the outer phase, so the phases of
+    a request add up to its duration.
+    """
+
+    def __init__(self, phase):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.scanned = {}
+        self.cache = None
+        self.duration = None
+        # [phase, started, seconds spent in nested spans] per open span
+        self._open = [[phase, self.started, 0.0]]
+
+    def enter(self, phase):
+        self._open.append([phase, time.perf_counter(), 0.0])
+
+    def exit(self):
+        phase, started, nested = self._open.pop()
+        elapsed = time.perf_counter() - started
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed - nested
+        if self._open:
+            self._open[-1][2] += elapsed
+
+    def close(self):
+        """Exit every open span, the request's own phase last; returns the request's duration"""
+        while self._open:
+            self.exit()
+        self.duration = time.perf_counter() - self.started
+        return self.duration
+
+
+class Metrics:
+    """Per-endpoint request metrics of this process, rendered in the Prometheus text format.
+
+    ``begin()`` starts a trace for the request running on the calling thread
+    and ``finish(endpoint, status, size)`` folds it into the endpoint's
+    totals. In between, ``span(phase)`` times a block of the request and
+    ``scanned(source, rows)`` / ``cache_result(result)`` count what it read;
+    outside a traced request they do nothing, so instrumented code can also
+    run in worker processes and background threads.
+    """
+
+    def __init__(self, prefix='dashboard'):
+        self.prefix = prefix
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._durations = {}
+        self._phases = {}
+        self._scanned = {}
+        self._bytes = {}
+        self._cache = {}
+
+    def begin(self, phase='compute'):
+        """Start tracing the current request; time outside any span counts as ``phase``"""
+        trace = self._local.trace = RequestTrace(phase)
+        return trace
+
+    @property
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def span(self, phase):
+        trace = self.current
+        if trace is None:
+            yield
+            return
+        trace.enter(phase)
+        try:
+            yield
+        finally:
+            trace.exit()
+
+    def scanned(self, source, rows):
+        trace = self.current
+        if trace is not None:
+            trace.scanned[source] = trace.scanned.get(source, 0) + rows
+
+    def cache_result(self, result):
+        trace = self.current
+        if trace is not None:
+            trace.cache = result
+
+    def finish(self, endpoint, status, size=None):
+        """Record the current request under ``endpoint``; returns its trace (None when not traced).
+
+        ``size`` is the response body in bytes, None for a streamed body.
+        """
+        trace = self.current
+        if trace is None:
+            return None
+        self._local.trace = None
+        duration = trace.close()
+
+        with self._lock:
+            key = (endpoint, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            _histogram(self._durations, endpoint).observe(duration)
+            for phase, seconds in trace.phases.items():
+                _histogram(self._phases, (endpoint, phase)).observe(seconds)
+            for source, rows in trace.scanned.items():
+                self._scanned[(endpoint, source)] = self._scanned.get((endpoint, source), 0) + rows
+            if size is not None:
+                self._bytes[endpoint] = self._bytes.get(endpoint, 0) + size
+            if trace.cache is not None:
+                key = (endpoint, trace.cache)
+                self._cache[key] = self._cache.get(key, 0) + 1
+        return trace
+
+    def render(self, gauges=None):
+        """Everything recorded so far as Prometheus text.
+
+        ``gauges`` maps a name to a stats dict (such as a cache's ``stats()``);
+        each numeric entry is written as the gauge ``<prefix>_<name>_<key>``.
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            _counter(lines, f'{p}_requests_total', "Requests served, by endpoint and status",
+                     self._requests, ('endpoint', 'status'))
+            _histograms(lines, f'{p}_request_duration_seconds', "Time spent handling a request",
+                        self._durations, ('endpoint',))
+            _histograms(lines, f'{p}_request_phase_seconds',
+                        "Time a request spent per phase: load, filter, compute, convert, encode, report",
+                        self._phases, ('endpoint', 'phase'))
+            _counter(lines, f'{p}_rows_scanned_total', "Raw rows, rollup cells and partition summaries read by requests",
+                     self._scanned, ('endpoint', 'source'))
+            _counter(lines, f'{p}_response_bytes_total', "Response body bytes sent, streamed bodies excluded",
+                     self._bytes, ('endpoint',))
+            _counter(lines, f'{p}_response_cache_total', "Response cache lookups, by result",
+                     self._cache, ('endpoint', 'result'))
+
+        for name, stats in (gauges or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# TYPE {p}_{name}_{key} gauge')
+                    lines.append(f'{p}_{name}_{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram(histograms, key):
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = Histogram()
+    return histogram
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _counter(lines, name, help_text, values, label_names):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for key, value in sorted(values.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        lines.append(f'{name}{{{_labels(label_names, key)}}} {value}')
+
+
+def _histograms(lines, name, help_text, histograms, label_names):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for key, histogram in sorted(histograms.items()):
+        labels = _labels(label_names, key if isinstance(key, tuple) else (key,))
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
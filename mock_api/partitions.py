@@ -0,0 +1,206 @@
+"""
+Year and quarter partitions of the date-sorted business data
+
+Rows are kept in date order, so the rows of one year (or quarter) are a
+contiguous range of every column. The snapshot manifest lists these
+partitions: their row range, first and last date and, per numeric column,
+the additive partials ``sum``, ``count`` and ``sumsq`` the rollup cube keeps
+plus ``min`` and ``max``. A query whose date range covers a partition whole
+takes that partition's aggregates from the manifest, and only the partitions
+the range cuts through are scanned. Partitions outside the range are never
+read, so old years cost nothing to keep.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_schema import widen
+
+PARTITION_BY = ('year', 'quarter')
+DEFAULT_PARTITION_BY = 'year'
+
+
+def partition_keys(dates, by):
+    """Partition of each datetime64 date: its year, or ``year * 4 + quarter - 1``"""
+    months = dates.astype('datetime64[M]').astype('int64')
+    years = months // 12 + 1970
+    return years if by == 'year' else years * 4 + months % 12 // 3
+
+
+def partition_label(key, by):
+    """``2024``, or ``2024-Q3`` when partitioned by quarter"""
+    return str(key) if by == 'year' else f'{key // 4}-Q{key % 4 + 1}'
+
+
+def partition_stats(dates, columns, by=DEFAULT_PARTITION_BY, offset=0):
+    """Partitions of a block of date-sorted rows, as manifest entries.
+
+    ``columns`` yields ``(name, values)`` pairs and is consumed one column at
+    a time; non-numeric columns are skipped. ``offset`` is the block's first
+    row in the dataset.
+    """
+    if by not in PARTITION_BY:
+        raise ValueError(f"Unknown partitioning: {by}")
+    dates = np.asarray(dates)
+    if len(dates) == 0:
+        return []
+
+    keys = partition_keys(dates, by)
+    if (keys[1:] < keys[:-1]).any():
+        raise ValueError("Partitions need date-sorted rows")
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+
+    parts = [{
+        'key': partition_label(int(keys[start]), by),
+        'start': offset + int(start),
+        'rows': int(end - start),
+        'min_date': pd.Timestamp(dates[start]).isoformat(),
+        'max_date': pd.Timestamp(dates[end - 1]).isoformat(),
+        'stats': {}
+    } for start, end in zip(starts, ends)]
+
+    for name, values in columns:
+        values = pd.Series(values, copy=False)
+        if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            continue
+        # Partials are accumulated wide, as the rollup cube accumulates them
+        wide = widen(values).to_numpy()
+        present = ~np.isnan(wide) if wide.dtype.kind == 'f' else np.ones(len(wide), dtype=bool)
+        filled = np.where(present, wide, 0)
+        squares = filled.astype('float64') ** 2
+        counts = np.add.reduceat(present, starts)
+        sums = np.add.reduceat(filled, starts)
+        sumsqs = np.add.reduceat(squares, starts)
+        with np.errstate(invalid='ignore'):
+            lows = np.fmin.reduceat(wide, starts)
+            highs = np.fmax.reduceat(wide, starts)
+        for part, count, total, sumsq, low, high in zip(parts, counts, sums, sumsqs, lows, highs):
+            part['stats'][name] = {
+                'sum': total.item(),
+                'count': int(count),
+                'sumsq': sumsq.item(),
+                'min': low.item() if count else None,
+                'max': high.item() if count else None
+            }
+    return parts
+
+
+def merge_partitions(parts, added):
+    """``parts`` followed by ``added``, the partitions of later rows; a partition both share is combined"""
+    if not parts or not added:
+        return list(parts) + list(added)
+    if added[0]['key'] < parts[-1]['key']:
+        raise ValueError("Added partitions are dated before existing ones")
+    if added[0]['key'] != parts[-1]['key']:
+        return list(parts) + list(added)
+
+    last, first = parts[-1], added[0]
+    stats = {}
+    for name, old in last['stats'].items():
+        new = first['stats'].get(name)
+        if new is None:
+            continue
+        lows = [value for value in (old['min'], new['min']) if value is not None]
+        highs = [value for value in (old['max'], new['max']) if value is not None]
+        stats[name] = {
+            'sum': old['sum'] + new['sum'],
+            'count': old['count'] + new['count'],
+            'sumsq': old['sumsq'] + new['sumsq'],
+            'min': min(lows) if lows else None,
+            'max': max(highs) if highs else None
+        }
+    combined = dict(
+        last,
+        rows=last['rows'] + first['rows'],
+        min_date=min(last['min_date'], first['min_date']),
+        max_date=max(last['max_date'], first['max_date']),
+        stats=stats
+    )
+    return list(parts[:-1]) + [combined] + list(added[1:])
+
+
+def date_range(filters):
+    """Inclusive ``(first, last)`` timestamps allowed by ``start_date``, ``end_date`` and ``year``; None when open"""
+    lo = pd.Timestamp(filters['start_date']) if 'start_date' in filters else None
+    hi = pd.Timestamp(filters['end_date']) if 'end_date' in filters else None
+    if 'year' in filters:
+        year = int(filters['year'])
+        first = pd.Timestamp(year=year, month=1, day=1)
+        last = pd.Timestamp(year=year + 1, month=1, day=1) - pd.Timedelta(1, 'ns')
+        lo = first if lo is None else max(lo, first)
+        hi = last if hi is None else min(hi, last)
+    return lo, hi
+
+
+class PartitionMap:
+    """The partitions of one loaded dataset, for pruning date ranges and whole-partition aggregates.
+
+    Built from the snapshot manifest when it lists every row's partition,
+    otherwise computed from the data once per load.
+    """
+
+    def __init__(self, by, parts):
+        self.by = by
+        self.parts = parts
+        self.min_dates = pd.to_datetime([part['min_date'] for part in parts]).to_numpy()
+        self.max_dates = pd.to_datetime([part['max_date'] for part in parts]).to_numpy()
+
+    @classmethod
+    def load(cls, dataset, by=DEFAULT_PARTITION_BY):
+        spec = (getattr(dataset.source, 'manifest', None) or {}).get('partitions')
+        if spec and sum(part['rows'] for part in spec['parts']) == dataset.rows:
+            return cls(spec['by'], spec['parts'])
+        return cls(by, cls._compute(dataset, by, 0))
+
+    def extend(self, dataset, start):
+        """Partitions of ``dataset``, whose first ``start`` rows are the rows these partitions cover"""
+        spec = (getattr(dataset.source, 'manifest', None) or {}).get('partitions')
+        if spec and spec['by'] == self.by and sum(part['rows'] for part in spec['parts']) == dataset.rows:
+            return PartitionMap(self.by, spec['parts'])
+        return PartitionMap(self.by, merge_partitions(self.parts, self._compute(dataset, self.by, start)))
+
+    @staticmethod
+    def _compute(dataset, by, start):
+        if 'date' not in dataset.columns or start >= dataset.rows:
+            return []
+        dates = dataset.select(['date'])['date'].to_numpy()[start:]
+        columns = (
+            (name, dataset.select([name])[name].iloc[start:])
+            for name in dataset.columns if name != 'date'
+        )
+        return partition_stats(dates, columns, by, start)
+
+    def __len__(self):
+        return len(self.parts)
+
+    def to_manifest(self):
+        return {'by': self.by, 'parts': self.parts}
+
+    def covered(self, filters):
+        """Positions ``(first, last)`` of the partitions wholly inside the filters' dates, None when none are"""
+        lo, hi = date_range(filters)
+        inside = np.ones(len(self.parts), dtype=bool)
+        if lo is not None:
+            inside &= self.min_dates >= lo.to_datetime64()
+        if hi is not None:
+            inside &= self.max_dates <= hi.to_datetime64()
+        positions = np.flatnonzero(inside)
+        if not len(positions):
+            return None
+        # Dates are sorted, so the partitions inside a range are consecutive
+        return int(positions[0]), int(positions[-1])
+
+    def partials(self, first, last, metrics):
+        """``{<metric>_<partial>: total}`` over partitions ``first`` to ``last``; None when a metric has no stats"""
+        totals = {}
+        for metric in metrics:
+            for partial in ('sum', 'count', 'sumsq'):
+                values = []
+                for part in self.parts[first:last + 1]:
+                    stats = part['stats'].get(metric)
+                    if stats is None:
+                        return None
+                    values.append(stats[partial])
+                totals[f'{metric}_{partial}'] = sum(values)
+        return totals
@@ -0,0 +1,114 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _timed(func, args):
+    # Runs in the worker: wall-clock start and end, comparable with the parent's clock
+    started = time.time()
+    result = func(*args)
+    return started, time.time(), result
+
+
+class ReportPool:
+    """Process pool for CPU-heavy report computations, with queue metrics.
+
+    ``run(func, *args)`` calls ``func(*args)`` in a worker process and blocks
+    until it returns. ``func`` must be a module-level function (it is pickled
+    by reference) and its result should be small, e.g. the encoded response
+    body. Workers are spawned on first use and keep their own dataset cache,
+    which maps the same snapshot files, so the data is shared through the
+    page cache rather than copied into each process.
+
+    With ``workers=0`` - or once the pool breaks or its workers cannot be
+    spawned - calls run in the calling thread instead.
+    """
+
+    def __init__(self, workers, initializer=None):
+        self.workers = workers
+        self.initializer = initializer
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.inline = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def run(self, func, *args):
+        executor = self._pool()
+        if executor is None:
+            with self._lock:
+                self.inline += 1
+            return func(*args)
+
+        submitted = time.time()
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        future = None
+        try:
+            future = executor.submit(_timed, func, args)
+            started, finished, result = future.result()
+        except BrokenProcessPool:
+            self._fall_back("Report worker pool broke")
+            return self.run(func, *args)
+        except Exception as e:
+            if future is None and isinstance(e, RuntimeError):
+                # Workers could not be spawned, typically from a script that imports the app
+                # without an ``if __name__ == '__main__'`` guard, which spawned workers re-run
+                self._fall_back("Report workers could not be spawned (missing __main__ guard?)")
+                return self.run(func, *args)
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        with self._lock:
+            self.completed += 1
+            wait = max(0.0, started - submitted)
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            self.run_seconds += finished - started
+        return result
+
+    def _fall_back(self, reason):
+        print(f"{reason}; running reports in-process")
+        with self._lock:
+            self.failed += 1
+            self._executor = None
+            self.workers = 0
+
+    def stats(self):
+        """Queue depth and wait times for the health endpoint"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queued': max(0, self.in_flight - self.workers),
+                'running': min(self.in_flight, self.workers),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'inline': self.inline,
+                'avg_wait_ms': round(self.wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3),
+                'avg_run_ms': round(self.run_seconds / self.completed * 1000, 3) if self.completed else 0.0
+            }
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                # Spawned, not forked: the server process runs threads that a fork would copy mid-flight
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=self.initializer
+                )
+            return self._executor
@@ -0,0 +1,152 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """Encoded body of one response plus its strong validator"""
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        # Content hash, so equal bodies always carry the same ETag
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU cache of encoded responses, sized by the bytes it holds.
+
+    Keys are whatever identifies a response completely - for the API that is
+    the path, the dataset version and the normalized query string, so an
+    entry can never outlive the data it was computed from: a new dataset
+    version simply stops matching old keys, which then age out of the LRU.
+    Once ``max_bytes`` is exceeded the least recently used entries are evicted;
+    a single body larger than the whole budget is never stored.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype):
+        """Store a body and return its entry (returned but not kept when it cannot fit)"""
+        entry = CachedResponse(body, mimetype)
+        size = len(body) + len(repr(key))
+        if size > self.max_bytes:
+            return entry
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+        return entry
+
+    def clear(self):
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+        return dropped
+
+    def stats(self):
+        """Counters for the health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SingleFlight:
+    """Coalesces identical concurrent computations: one caller computes, the others wait for it.
+
+    ``do(key, compute)`` runs ``compute()`` unless a call with the same key is
+    already in flight, in which case it waits for that call and shares its
+    result (or its exception). Nothing is kept once the call completes -
+    caching the result is up to the caller.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, compute):
+        """``(result, shared)``: shared is True when the result came from another caller's computation"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced
+            }
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+
+from data_index import DataIndex
+from data_schema import widen
+
+
+class RollupCube:
+    """Pre-aggregated partials over date x department x region.
+
+    Each cell holds, per metric, the additive partials ``sum``, ``count`` and
+    ``sumsq`` (sum of squares). Any groupby over a subset of the dimensions -
+    filtered or not - can then be answered by summing cells instead of
+    scanning raw rows, and sum/count/mean/var/std can all be recovered exactly
+    from those partials. Cells are sorted by date, so a date range is a
+    contiguous slice of them.
+
+    Rolling up only pays when it combines rows. When the rows are already
+    (nearly) unique on the cell key - one row per date, department and
+    region, as in the business data - the cube stores nothing: its cells are
+    the typed rows themselves, shared with the dataset without a copy, and
+    ``partials()`` derives a cell's partials from its row when a query asks.
+    """
+
+    DIMENSIONS = ('date', 'department', 'region')
+    # Functionally dependent on the date, so carried along without splitting cells
+    ATTRIBUTES = ('quarter', 'year', 'quarter_num')
+    # Derived from a datetime64 date column: first day of the row's month
+    MONTH = 'month'
+    PARTIALS = ('sum', 'count', 'sumsq')
+    # Filters answered by binary search on the cell dates
+    DATE_FILTERS = ('start_date', 'end_date', 'year')
+    # Partials each aggregation is computed from
+    FINALIZED_FROM = {'sum': ('sum',), 'count': ('count',), 'mean': ('sum', 'count'), 'var': PARTIALS, 'std': PARTIALS}
+    # Partials are stored only when there are at most this many cells per row
+    MAX_CELL_RATIO = 0.5
+
+    def __init__(self, cells, metrics, aggregated=True):
+        self.cells = cells
+        self.metrics = metrics
+        # False when the cells are the raw rows, with metric values instead of partials
+        self.aggregated = aggregated
+        dated = 'date' in cells.columns and pd.api.types.is_datetime64_any_dtype(cells['date'])
+        self._dates = DataIndex(cells['date'].to_numpy(), {}) if dated else None
+
+    @classmethod
+    def build(cls, df, aggregate=None):
+        """Collapse a raw business frame into one row per finest-grain cell.
+
+        With ``aggregate`` None the partials are only stored when that at
+        least halves the rows; otherwise the rows are kept as the cells.
+        """
+        keys = [col for col in cls.DIMENSIONS + cls.ATTRIBUTES if col in df.columns]
+        metrics = [
+            col for col in df.columns
+            if col not in keys and pd.api.types.is_numeric_dtype(df[col])
+        ]
+
+        if df.empty or not keys:
+            return cls(pd.DataFrame(columns=keys), metrics)
+
+        key_values = [df[key] for key in keys]
+        if aggregate is None:
+            cells = df.groupby(key_values, sort=False, observed=True).ngroups
+            aggregate = cells <= len(df) * cls.MAX_CELL_RATIO
+        if not aggregate:
+            # The frame's own columns, not copies: shared with the dataset (and its snapshot pages)
+            return cls(pd.DataFrame({col: df[col] for col in keys + metrics}, copy=False), metrics, aggregated=False)
+
+        if 'date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['date']):
+            key_values.append(pd.Series(cls.months(df['date']), index=df.index, name=cls.MONTH))
+
+        # Partials are accumulated wide, whatever the compact storage type is
+        values = pd.DataFrame({col: widen(df[col]) for col in metrics})
+        grouped = values.groupby(key_values, sort=True, observed=True)
+        sums = grouped.sum()
+        counts = grouped.count()
+        # Squares are taken in float64 so large integer metrics cannot overflow
+        sumsqs = values.astype('float64').pow(2).groupby(key_values, sort=True, observed=True).sum()
+
+        cells = pd.concat(
+            [sums.add_suffix('_sum'), counts.add_suffix('_count'), sumsqs.add_suffix('_sumsq')],
+            axis=1
+        ).reset_index()
+
+        return cls(cells, metrics)
+
+    @staticmethod
+    def months(dates):
+        """First day of each date's month, in the dates' unit"""
+        return dates.to_numpy().astype('datetime64[M]').astype(dates.dtype)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def date_span(self, filters):
+        """Slice of the cells inside the filters' date range (start_date, end_date and year)"""
+        dates = {name: value for name, value in filters.items() if name in self.DATE_FILTERS}
+        if self._dates is None or not dates:
+            return slice(0, len(self.cells))
+        return self._dates.select(dates)
+
+    def extend(self, df, start):
+        """Cube over ``df``, whose first ``start`` rows are the rows this cube covers.
+
+        Unaggregated cells are the rows, so the cube just refers to the
+        extended frame, whatever its size. Otherwise only the new rows are
+        grouped, and cells on the shared boundary date have their partials
+        summed, so the grouping work is proportional to the batch; the cells
+        are still copied into the new cube's frame, which is proportional to
+        the number of cells.
+        """
+        if not self.aggregated:
+            if len(self) != start:
+                raise ValueError("The cube does not cover the existing rows")
+            return RollupCube.build(df, aggregate=False)
+
+        rows = df.iloc[start:]
+        if rows.empty:
+            return self
+
+        added = RollupCube.build(rows, aggregate=True)
+        if len(self) == 0:
+            return added
+        if added.metrics != self.metrics or list(added.cells.columns) != list(self.cells.columns):
+            raise ValueError("Appended rows do not have the cube's columns")
+
+        cells = _align_categories(self.cells, added.cells)
+        split = int(cells['date'].searchsorted(added.cells['date'].iloc[0], side='left'))
+        if split < len(cells) and added.cells['date'].iloc[0] < cells['date'].iloc[-1]:
+            raise ValueError("Appended rows are dated before existing cells")
+
+        tail = pd.concat([cells.iloc[split:], added.cells], ignore_index=True)
+        if split < len(cells):
+            # The batch starts on the last existing date: merge the cells they share
+            keys = [col for col in cells.columns if not col.endswith(tuple(f'_{p}' for p in self.PARTIALS))]
+            tail = tail.groupby(keys, sort=True, observed=True).sum().reset_index()
+
+        return RollupCube(pd.concat([cells.iloc[:split], tail], ignore_index=True), self.metrics)
+
+    def group_sums(self, cells, by, columns):
+        """Partial ``columns`` (``<metric>_<partial>``) of ``cells`` summed per group of the ``by`` columns.
+
+        ``cells`` is a slice of this cube's cells. Unaggregated cells get their
+        month from the date when grouped by it.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        values = {}
+        for name in by:
+            if name == self.MONTH and name not in cells.columns:
+                values[name] = self.months(cells['date'])
+            else:
+                values[name] = cells[name].array
+        if self.aggregated:
+            values.update((column, cells[column].array) for column in columns)
+        else:
+            values.update(self._row_partials(cells, columns))
+        return pd.DataFrame(values, copy=False).groupby(by, sort=True, observed=True).sum()
+
+    def partial_sums(self, cells, columns):
+        """The partial ``columns`` of ``cells`` summed over every cell, as a Series"""
+        if self.aggregated:
+            return cells[columns].sum()
+        return pd.Series({column: values.sum() for column, values in self._row_partials(cells, columns)})
+
+    def _row_partials(self, cells, columns):
+        # The same partials an aggregated one-row cell would hold, as (column, array) pairs
+        wide = {}
+        for column in columns:
+            metric, partial = column.rsplit('_', 1)
+            if metric not in wide:
+                values = widen(cells[metric]).to_numpy()
+                wide[metric] = (values, ~np.isnan(values) if values.dtype.kind == 'f' else None)
+            values, present = wide[metric]
+            if partial == 'count':
+                yield column, np.ones(len(values), dtype='int64') if present is None else present.astype('int64')
+                continue
+            if partial == 'sumsq':
+                values = values.astype('float64') ** 2
+            yield column, values if present is None else np.where(present, values, 0)
+
+    def rollup(self, by, aggregations, mask=None):
+        """Re-aggregate the cube, optionally restricted to a boolean cell mask.
+
+        ``aggregations`` maps a metric to one aggregation name or a list of
+        names out of sum/count/mean/var/std. A single name keeps the metric as
+        the column name, a list produces ``<metric>_<agg>`` columns - the same
+        shapes ``groupby().agg()`` plus the usual column flattening produce.
+        """
+        cells = self.cells if mask is None else self.cells[mask]
+        return self.finalize(self.group_sums(cells, by, self.partial_columns(aggregations)), aggregations)
+
+    @classmethod
+    def partial_columns(cls, aggregations):
+        """Cell columns holding the partials ``aggregations`` (metric to aggregation names) are finalized from"""
+        columns = []
+        for metric, funcs in aggregations.items():
+            funcs = [funcs] if isinstance(funcs, str) else funcs
+            needed = {partial for func in funcs for partial in cls.FINALIZED_FROM.get(func, cls.PARTIALS)}
+            columns += [f'{metric}_{partial}' for partial in cls.PARTIALS if partial in needed]
+        return columns
+
+    @classmethod
+    def finalize(cls, partials, aggregations):
+        """Turn grouped partial sums into the requested aggregations, one row per group"""
+        result = pd.DataFrame(index=partials.index)
+        for metric, funcs in aggregations.items():
+            for func in ([funcs] if isinstance(funcs, str) else funcs):
+                name = metric if isinstance(funcs, str) else f'{metric}_{func}'
+                result[name] = cls._finalize(partials, metric, func)
+
+        return result.reset_index()
+
+    @staticmethod
+    def _finalize(grouped, metric, func):
+        if func == 'sum':
+            return grouped[f'{metric}_sum']
+        if func == 'count':
+            return grouped[f'{metric}_count']
+
+        total = grouped[f'{metric}_sum']
+        count = grouped[f'{metric}_count']
+        if func == 'mean':
+            return total / count.where(count > 0)
+
+        if func in ('var', 'std'):
+            # Sample variance (ddof=1) from the additive partials, matching pandas
+            sumsq = grouped[f'{metric}_sumsq']
+            n = count.where(count > 1).astype('float64')
+            variance = ((sumsq - total.astype('float64') ** 2 / n) / (n - 1)).clip(lower=0)
+            return variance if func == 'var' else np.sqrt(variance)
+
+        raise ValueError(f"Unsupported rollup aggregation: {func}")
+
+
+def _align_categories(cells, like):
+    """``cells`` with each categorical key recoded to ``like``'s (appended) categories"""
+    recoded = {
+        col: cells[col].cat.set_categories(like[col].cat.categories)
+        for col in cells.columns
+        if isinstance(cells[col].dtype, pd.CategoricalDtype) and cells[col].dtype != like[col].dtype
+    }
+    # Only the recoded keys are replaced; rebuilding the frame would copy every partial column
+    return cells.assign(**recoded) if recoded else cells
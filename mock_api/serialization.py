@@ -0,0 +1,133 @@
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import JSONProvider
+
+from data_schema import DATE_FORMAT, widen
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder is used instead
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+if HAS_ORJSON:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def column_values(values, arrays=False):
+    """JSON-ready values of one column, converted a whole column at a time.
+
+    Dates become ``YYYY-MM-DD`` strings, float32 scores are widened back to
+    their two decimals and NaN, inf and NaT become None. With ``arrays`` a
+    numeric column without missing values is returned as a NumPy array for an
+    encoder that can write arrays directly, otherwise values are a plain list.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        text = values.dt.strftime(DATE_FORMAT)
+        return text.astype(object).where(values.notna(), None).tolist()
+
+    if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object:
+        objects = values.astype(object)
+        return objects.where(objects.notna(), None).tolist()
+
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        array = np.ascontiguousarray(values.to_numpy())
+        return array if arrays else array.tolist()
+
+    if pd.api.types.is_float_dtype(values):
+        array = np.ascontiguousarray(widen(values).to_numpy())
+        finite = np.isfinite(array)
+        if finite.all():
+            return array if arrays else array.tolist()
+        objects = array.astype(object)
+        objects[~finite] = None
+        return objects.tolist()
+
+    return values.tolist()
+
+
+def frame_records(df):
+    """``[{column: value}, ...]`` - the ``to_dict(orient='records')`` shape, built from column lists"""
+    names = list(df.columns)
+    columns = [column_values(df[name]) for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def frame_columns(df):
+    """``{"columns": [...], "data": {column: [...]}}``, serialized straight from the column arrays"""
+    names = list(df.columns)
+    return {
+        'columns': names,
+        'data': {name: column_values(df[name], arrays=HAS_ORJSON) for name in names}
+    }
+
+
+def dumps(obj):
+    """Encode ``obj`` as compact JSON bytes with orjson when installed, else the standard library"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+    try:
+        text = json.dumps(obj, default=_default, allow_nan=False, separators=(',', ':'))
+    except ValueError:
+        # A NaN or inf float somewhere in the payload: swap them for null and retry
+        text = json.dumps(_finite(obj), default=_default, allow_nan=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, pd.Series):
+        return column_values(value)
+    if value is pd.NaT:
+        return None
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        item = value.item()
+        return None if isinstance(item, float) and not math.isfinite(item) else item
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finite(obj):
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by ``dumps``, so every ``jsonify`` takes the fast path.
+
+    ``timer`` is an optional span factory (such as ``Metrics.span``) that
+    ``jsonify`` encodes its payload under, as the ``encode`` phase.
+    """
+
+    def __init__(self, app, timer=None):
+        super().__init__(app)
+        self.timer = timer
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.timer is None:
+            return self._app.response_class(dumps(obj), mimetype='application/json')
+        with self.timer('encode'):
+            body = dumps(obj)
+        return self._app.response_class(body, mimetype='application/json')
@@ -0,0 +1,46 @@
+import io
+import zlib
+
+from data_schema import display_frame
+from serialization import dumps, frame_records
+
+
+def csv_stream(columns, chunks):
+    """Encode frame chunks as CSV text: the header first, then each chunk's rows.
+
+    Only one chunk is ever formatted at a time, so memory stays flat however
+    many rows are exported, and the header goes out before any row is built.
+    """
+    yield ','.join(_csv_field(column) for column in columns) + '\n'
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        buffer = io.StringIO()
+        display_frame(chunk).to_csv(buffer, header=False, index=False)
+        yield buffer.getvalue()
+
+
+def ndjson_stream(chunks):
+    """Encode frame chunks as newline-delimited JSON, one record per line"""
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        yield b''.join(dumps(record) + b'\n' for record in frame_records(chunk))
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a stream of text chunks into a single gzip member on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _csv_field(value):
+    value = str(value)
+    if any(char in value for char in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
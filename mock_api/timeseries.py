@@ -0,0 +1,68 @@
+import numpy as np
+
+
+# Bucket sizes a trend can be summed into, finest first
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+# Days from the epoch (a Thursday) to the first Monday
+EPOCH_MONDAY = 4
+
+
+def bucket_starts(dates, granularity):
+    """First date of each datetime64 date's bucket, in the dates' unit; weeks start on Monday"""
+    if granularity == 'day':
+        starts = dates.astype('datetime64[D]')
+    elif granularity == 'week':
+        days = dates.astype('datetime64[D]').astype('int64')
+        starts = (days - (days - EPOCH_MONDAY) % 7).astype('datetime64[D]')
+    elif granularity == 'month':
+        starts = dates.astype('datetime64[M]')
+    elif granularity == 'quarter':
+        months = dates.astype('datetime64[M]').astype('int64')
+        starts = (months - months % 3).astype('datetime64[M]')
+    else:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return starts.astype(dates.dtype)
+
+
+def auto_granularity(dates, points):
+    """Finest granularity that puts the sorted ``dates`` into at most ``points`` buckets (else the coarsest)"""
+    for granularity in GRANULARITIES:
+        starts = bucket_starts(dates, granularity)
+        if np.count_nonzero(starts[1:] != starts[:-1]) + 1 <= points:
+            return granularity
+    return GRANULARITIES[-1]
+
+
+def lttb_indices(x, y, points):
+    """Positions of the ``points`` samples of a series that Largest-Triangle-Three-Buckets keeps.
+
+    The first and last samples are always kept. The ones in between are cut
+    into ``points - 2`` equal buckets, and each bucket keeps the sample that
+    spans the largest triangle with the sample kept before it and the average
+    of the next bucket. Peaks and dips survive, unlike with plain averaging
+    or striding. ``x`` must be ascending.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # Bucket i holds samples edges[i] to edges[i + 1] - 1, none empty since n > points
+    edges = np.arange(points - 1) * (n - 2) // (points - 2) + 1
+
+    kept = np.empty(points, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < points - 2:
+            after = slice(hi, edges[bucket + 2])
+            next_x, next_y = x[after].mean(), y[after].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle areas; only their order matters
+        areas = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous]) - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
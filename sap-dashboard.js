@@ -88,6 +88,7 @@ class NavigationManager {
     }
 
     async loadSectionData(sectionId) {
+        resetDashboardBatch();
         switch (sectionId) {
             case 'overview':
                 await Promise.all([
@@ -108,6 +109,116 @@ class NavigationManager {
     }
 }
 
+// Dashboard panels for one filter set, fetched together in a single batch request
+const DASHBOARD_PANELS = [
+    'kpis', 'revenue-trend', 'monthly-summary', 'department-performance',
+    'region-distribution', 'quarterly-trends', 'ytd-performance', 'regional-heatmap'
+];
+let dashboardBatch = null;
+
+// Trend charts come bucketed and downsampled by the server, so long histories stay light to draw
+const TREND_PARAMS = { granularity: 'auto', max_points: '500' };
+
+function withTrendParams(filterParams) {
+    const params = new URLSearchParams(filterParams);
+    for (const [name, value] of Object.entries(TREND_PARAMS)) params.set(name, value);
+    return params.toString();
+}
+
+function resetDashboardBatch() {
+    // The next panel load fetches fresh data instead of reusing the last batch
+    dashboardBatch = null;
+}
+
+async function fetchPanel(panel) {
+    const filterParams = filterManager.getFilterParams();
+    if (!dashboardBatch || dashboardBatch.filterParams !== filterParams) {
+        const params = new URLSearchParams(withTrendParams(filterParams));
+        params.set('panels', DASHBOARD_PANELS.join(','));
+        const batch = {
+            filterParams,
+            panels: safeFetch(`${API_BASE}/google/dashboard?${params}`)
+                .then(response => response.json())
+                .then(data => data.panels)
+        };
+        batch.panels.catch(() => {
+            if (dashboardBatch === batch) resetDashboardBatch();
+        });
+        dashboardBatch = batch;
+    }
+    const panels = await dashboardBatch.panels;
+    return panels[panel];
+}
+
+// Live updates: KPIs and chart deltas pushed by the server when the data changes
+let liveStream = null;
+let liveFilterParams = null;
+let liveRedraw = null;
+
+function connectLiveUpdates() {
+    if (!window.EventSource) return;
+    if (liveStream) liveStream.close();
+
+    liveFilterParams = filterManager.getFilterParams();
+    liveStream = new EventSource(`${API_BASE}/google/stream?${withTrendParams(liveFilterParams)}`);
+    let liveVersion = null;
+
+    liveStream.addEventListener('snapshot', (event) => {
+        const snapshot = JSON.parse(event.data);
+        // Reconnected after the data changed: reload what is on screen
+        if (liveVersion && snapshot.version !== liveVersion) {
+            resetDashboardBatch();
+            scheduleLiveRedraw();
+        }
+        liveVersion = snapshot.version;
+    });
+
+    liveStream.addEventListener('kpis', (event) => {
+        const update = JSON.parse(event.data);
+        liveVersion = update.version;
+        patchDashboardBatch('kpis', () => update.kpis);
+        renderKPIs(update.kpis);
+    });
+
+    liveStream.addEventListener('panel-delta', (event) => {
+        const delta = JSON.parse(event.data);
+        liveVersion = delta.version;
+        patchDashboardBatch(delta.panel, (records) => applyRecordDelta(records, delta));
+        scheduleLiveRedraw();
+    });
+}
+
+function patchDashboardBatch(panel, update) {
+    // Only the cached batch for the stream's filters can take the update
+    if (!dashboardBatch || dashboardBatch.filterParams !== liveFilterParams) return;
+    dashboardBatch.panels = dashboardBatch.panels.then(panels => ({ ...panels, [panel]: update(panels[panel]) }));
+}
+
+function recordKey(record) {
+    // Chart records are identified by their text fields (date, department, region, ...)
+    return Object.entries(record)
+        .filter(([, value]) => typeof value === 'string')
+        .map(([name, value]) => `${name}=${value}`)
+        .join('&');
+}
+
+function applyRecordDelta(records, delta) {
+    const byKey = new Map((records || []).map(record => [recordKey(record), record]));
+    delta.remove.forEach(key => byKey.delete(recordKey(key)));
+    delta.upsert.forEach(record => byKey.set(recordKey(record), record));
+    return Array.from(byKey.values());
+}
+
+function scheduleLiveRedraw() {
+    // Deltas for several panels arrive together, redraw once after the burst
+    clearTimeout(liveRedraw);
+    liveRedraw = setTimeout(() => {
+        const section = document.querySelector('.section.active')?.id;
+        if (section === 'overview') loadMainCharts();
+        if (section === 'analytics') loadAnalyticsCharts();
+    }, 250);
+}
+
 // Filter Manager
 class FilterManager {
     constructor() {
@@ -125,8 +236,18 @@ class FilterManager {
     }
 
     async fetchFilterData() {
-        const response = await safeFetch(`${API_BASE}/google/data`);
-        return await response.json();
+        // Only the filter columns are needed, fetched page by page
+        const rows = [];
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ fields: 'year,region,department', limit: '5000' });
+            if (cursor) params.append('cursor', cursor);
+            const response = await safeFetch(`${API_BASE}/google/data?${params}`);
+            const page = await response.json();
+            rows.push(...page.rows);
+            cursor = page.next_cursor;
+        } while (cursor);
+        return rows;
     }
 
     populateFilters(data) {
@@ -180,6 +301,8 @@ class FilterManager {
     }
 
     async applyFilters() {
+        resetDashboardBatch();
+        connectLiveUpdates();
         showLoading();
         try {
             await Promise.all([
@@ -287,19 +410,8 @@ function showNotification(message, type = 'info') {
 // KPI Management
 async function loadKPIs() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await safeFetch(`${API_BASE}/google/kpis?${filterParams}`);
-        const kpis = await response.json();
-
-        // Update KPI values with logging
-        console.log('📊 Updating KPI cards with data:', kpis);
-        
-        updateKPICard('totalRevenue', formatCurrency(kpis.total_revenue || 0), kpis.revenue_growth || 0);
-        updateKPICard('totalProfit', formatCurrency(kpis.total_profit || 0), kpis.profit_growth || 0);
-        updateKPICard('totalExpenses', formatCurrency(kpis.total_expenses || 0), kpis.expenses_growth || 0);
-        updateKPICard('avgROI', formatPercentage(kpis.avg_roi || 0), kpis.roi_growth || 0);
-        updateKPICard('totalEmployees', formatNumber(kpis.total_employees || 0), kpis.employee_growth || 0);
-        updateKPICard('expenseEfficiency', `${(kpis.expense_efficiency || 0).toFixed(2)}x`, kpis.efficiency_growth || 0);
+        const kpis = await fetchPanel('kpis');
+        renderKPIs(kpis);
 
         // Load sparklines
         await loadSparklines();
@@ -311,6 +423,18 @@ async function loadKPIs() {
     }
 }
 
+function renderKPIs(kpis) {
+    // Update KPI values with logging
+    console.log('📊 Updating KPI cards with data:', kpis);
+
+    updateKPICard('totalRevenue', formatCurrency(kpis.total_revenue || 0), kpis.revenue_growth || 0);
+    updateKPICard('totalProfit', formatCurrency(kpis.total_profit || 0), kpis.profit_growth || 0);
+    updateKPICard('totalExpenses', formatCurrency(kpis.total_expenses || 0), kpis.expenses_growth || 0);
+    updateKPICard('avgROI', formatPercentage(kpis.avg_roi || 0), kpis.roi_growth || 0);
+    updateKPICard('totalEmployees', formatNumber(kpis.total_employees || 0), kpis.employee_growth || 0);
+    updateKPICard('expenseEfficiency', `${(kpis.expense_efficiency || 0).toFixed(2)}x`, kpis.efficiency_growth || 0);
+}
+
 function updateKPICard(elementId, value, trend) {
     console.log(`🔄 Updating KPI card: ${elementId} = ${value}, trend = ${trend}`);
     
@@ -357,9 +481,7 @@ function updateKPICard(elementId, value, trend) {
 
 async function loadSparklines() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/revenue-trend?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('revenue-trend');
 
         // Create sparklines for each KPI
         const sparklineData = data.slice(-12); // Last 12 data points
@@ -415,9 +537,7 @@ async function loadMainCharts() {
 
 async function loadMonthlySummaryChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/monthly-summary?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('monthly-summary');
 
         if (!data.length) return;
 
@@ -485,9 +605,7 @@ async function loadMonthlySummaryChart() {
 
 async function loadRevenueTrendChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/revenue-trend?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('revenue-trend');
 
         const trace = {
             x: data.map(item => {
@@ -570,9 +688,7 @@ async function loadRevenueTrendChart() {
 
 async function loadDepartmentChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/department-performance?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('department-performance');
 
         // Sort data by revenue for better visualization
         data.sort((a, b) => b.revenue - a.revenue);
@@ -669,9 +785,7 @@ async function loadAnalyticsCharts() {
 
 async function loadRegionalChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/region-distribution?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('region-distribution');
 
         const trace = {
             labels: data.map(item => item.region),
@@ -712,9 +826,7 @@ async function loadRegionalChart() {
 
 async function loadQuarterlyChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/quarterly-trends?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('quarterly-trends');
 
         const revenueTrace = {
             x: data.map(item => item.quarter),
@@ -788,9 +900,7 @@ async function loadQuarterlyChart() {
 
 async function loadProfitMarginChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/department-performance?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('department-performance');
 
         // Calculate profit margin for each department
         const profitMarginData = data.map(item => ({
@@ -835,9 +945,7 @@ async function loadProfitMarginChart() {
 
 async function loadMarketShareChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/department-performance?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('department-performance');
 
         const trace = {
             labels: data.map(item => item.department),
@@ -869,9 +977,7 @@ async function loadMarketShareChart() {
 
 async function loadYTDChart() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/ytd-performance?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('ytd-performance');
 
         if (!data.length) return;
 
@@ -914,9 +1020,7 @@ async function loadYTDChart() {
 
 async function loadKPIHeatmap() {
     try {
-        const filterParams = filterManager.getFilterParams();
-        const response = await fetch(`${API_BASE}/google/charts/regional-heatmap?${filterParams}`);
-        const data = await response.json();
+        const data = await fetchPanel('regional-heatmap');
 
         if (!data.length) return;
 
@@ -1414,7 +1518,7 @@ class FullscreenManager {
             
             switch (chartId) {
                 case 'revenueTrendChart':
-                    const revenueResponse = await fetch(`${API_BASE}/google/charts/revenue-trend?${filterParams}`);
+                    const revenueResponse = await fetch(`${API_BASE}/google/charts/revenue-trend?${withTrendParams(filterParams)}`);
                     const revenueData = await revenueResponse.json();
                     
                     data = [{
@@ -1556,6 +1660,7 @@ document.addEventListener('DOMContentLoaded', async () => {
         
         // Initialize refresh button
         document.getElementById('refreshBtn')?.addEventListener('click', async () => {
+            resetDashboardBatch();
             showLoading();
             try {
                 await Promise.all([
@@ -1604,6 +1709,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 }
                 
                 hideLoading();
+                connectLiveUpdates();
                 console.log('✅ SAP Dashboard initialized successfully');
             } else {
                 throw new Error('API health check failed');
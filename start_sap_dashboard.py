@@ -4,22 +4,32 @@ SAP Dashboard Launcher
 Enhanced Business Intelligence Dashboard with Power BI-style interactivity
 """
 
+import argparse
+import importlib.util
+import json
 import subprocess
 import sys
 import time
+import urllib.error
+import urllib.request
 import webbrowser
 import os
 from pathlib import Path
 
+API_URL = 'http://localhost:5000'
+# Seconds to wait for the API to report ready; large datasets take a while to load
+READY_TIMEOUT = 300
+# Readiness polling starts fast and backs off to this interval (seconds)
+MAX_POLL_INTERVAL = 1.0
+
 def check_dependencies():
     """Check if required Python packages are installed"""
     required_packages = ['flask', 'flask-cors', 'pandas', 'numpy']
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
+        # Finding the module is enough; importing pandas here would only slow the launch
+        if importlib.util.find_spec(package.replace('-', '_')) is None:
             missing_packages.append(package)
     
     if missing_packages:
@@ -36,8 +46,46 @@ def check_dependencies():
     
     return True
 
-def start_api_server():
-    """Start the Flask API server"""
+def wait_until_ready(process, timeout=READY_TIMEOUT):
+    """Poll the API's readiness endpoint with backoff until it answers 200.
+    
+    Returns ``(ready, error)``: ready is False when the server exits, reports
+    that loading the data failed (with its error) or is still not ready after
+    ``timeout`` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    interval = 0.05
+    reported = None
+    
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False, None
+        
+        try:
+            with urllib.request.urlopen(f'{API_URL}/api/ready', timeout=5):
+                return True, None
+        except urllib.error.HTTPError as e:
+            # 503 while the data loads or the warm-up runs; the body says which
+            try:
+                state = json.loads(e.read())
+            except ValueError:
+                state = {}
+            if e.code == 500 and state.get('error'):
+                return False, state['error']
+            stage = 'warming' if state.get('data_loaded') else 'loading'
+            if stage != reported:
+                print("⏳ Loading business data..." if stage == 'loading' else "🔥 Warming up dashboard panels...")
+                reported = stage
+        except OSError:
+            pass  # not accepting connections yet
+        
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+    
+    return False, None
+
+def start_api_server(warm_up=True):
+    """Start the Flask API server and wait until it reports ready"""
     print("🚀 Starting SAP Dashboard API Server...")
     
     api_script = Path(__file__).parent / 'mock_api' / 'app.py'
@@ -55,27 +103,23 @@ def start_api_server():
     
     try:
         # Start the Flask server in a subprocess with better error handling
-        process = subprocess.Popen([
-            sys.executable, str(api_script)
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
+        command = [sys.executable, str(api_script)] + (['--warm-up'] if warm_up else [])
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
            creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0)
         
-        # Give the server more time to start
-        time.sleep(5)
-        
-        # Check if the process is still running
-        if process.poll() is None:
-            print("✅ API Server started successfully on http://localhost:5000")
-            
-            # Test the API connection
-            try:
-                import urllib.request
-                urllib.request.urlopen('http://localhost:5000/api/health', timeout=5)
-                print("✅ API Health check passed")
-            except Exception as e:
-                print(f"⚠️ API started but health check failed: {e}")
-            
+        start = time.monotonic()
+        ready, error = wait_until_ready(process)
+        if ready:
+            print(f"✅ API Server ready on {API_URL} in {time.monotonic() - start:.1f}s")
             return process
+        elif error:
+            print(f"❌ API Server could not load the business data: {error}")
+            process.terminate()
+            return None
+        elif process.poll() is None:
+            print(f"❌ API Server did not become ready within {READY_TIMEOUT}s")
+            process.terminate()
+            return None
         else:
             stdout, stderr = process.communicate()
             print(f"❌ API Server failed to start:")
@@ -109,6 +153,11 @@ def open_dashboard():
 
 def main():
     """Main function to start the SAP Dashboard"""
+    parser = argparse.ArgumentParser(description="Start the SAP dashboard API server and open the dashboard")
+    parser.add_argument('--no-warm-up', action='store_true',
+                        help="Open the dashboard as soon as the data is loaded, without precomputing its panels")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🏢 SAP BUSINESS INTELLIGENCE DASHBOARD")
     print("=" * 60)
@@ -152,7 +201,7 @@ def main():
     
     # Start API server
     print("🚀 Starting API server...")
-    api_process = start_api_server()
+    api_process = start_api_server(warm_up=not args.no_warm_up)
     if not api_process:
         print("❌ Failed to start API server")
         print("\n🔧 Troubleshooting tips:")
@@ -162,10 +211,6 @@ def main():
         input("Press Enter to exit...")
         return 1
     
-    # Wait a moment for server to fully initialize
-    print("⏳ Initializing server...")
-    time.sleep(3)
-    
     # Open dashboard
     print("🌐 Opening dashboard...")
     if not open_dashboard():